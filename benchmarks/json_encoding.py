@@ -0,0 +1,69 @@
+"""
+Compares FastAPI's default serialization path (jsonable_encoder + JSONResponse) with
+responses.FastJSONResponse on payloads shaped like the ones the API returns:
+
+    PYTHONPATH=src python benchmarks/json_encoding.py
+"""
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from data_models import Element, Person, PoliticalParty
+from responses import FastJSONResponse
+
+
+def relationship_rows(n: int) -> list:
+    return [
+        {
+            "arquivo_doc": f"https://arquivo.pt/wayback/20100101000000/https://www.publico.pt/{i}",
+            "title": "Costa acusa Governo de falhar nas metas do défice orçamental",
+            "domain": "publico.pt",
+            "original_url": f"https://www.publico.pt/{i}",
+            "paragraph": "O secretário-geral do PS considerou que o executivo " * 4,
+            "date": "2010-01-01",
+            "ent1_id": "Q610788",
+            "ent1_img": "/assets/images/personalities_small/Q610788.jpg",
+            "ent1_str": "António Costa",
+            "ent2_id": "Q557151",
+            "ent2_img": "/assets/images/personalities_small/Q557151.jpg",
+            "ent2_str": "Rui Rio",
+            "rel_type": "opposes",
+        }
+        for i in range(n)
+    ]
+
+
+def person() -> Person:
+    elements = [Element(f"http://www.wikidata.org/entity/Q{i}", f"cargo {i}") for i in range(20)]
+    return Person(
+        wiki_id="Q610788",
+        name="António Costa",
+        image_url="/assets/images/personalities_small/Q610788.jpg",
+        parties=[PoliticalParty("Q847263", "Partido Socialista", "/assets/images/parties/Q847263.svg")],
+        positions=elements,
+        education=elements[:3],
+        occupations=elements[:5],
+        governments=elements[:4],
+        assemblies=elements[:6],
+        relationships_charts=[
+            {"opposes": 3, "supports": 1, "opposed_by": 2, "supported_by": 0, "year": 1994 + i} for i in range(33)
+        ],
+    )
+
+
+def main():
+    payloads = {
+        "Person dataclass": person(),
+        "1,000 relationship rows": relationship_rows(1000),
+        "10,000 relationship rows": relationship_rows(10000),
+    }
+    for name, payload in payloads.items():
+        runs = 200 if isinstance(payload, Person) else 5
+        default = timeit.timeit(lambda p=payload: JSONResponse(jsonable_encoder(p)).body, number=runs) / runs
+        fast = timeit.timeit(lambda p=payload: FastJSONResponse(p).body, number=runs) / runs
+        print(f"{name:>25}: jsonable_encoder {default * 1000:8.2f}ms  orjson {fast * 1000:8.2f}ms  x{default / fast:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Leases on the records handed out by /annotator/next, so that annotators working at the
+same time never get the same record: a record leased to one annotator is skipped for
+the others until it is annotated or its lease expires.
+
+Leases are shared by every API worker through a small JSON file, record_id -> [annotator,
+expires at, in time.time() seconds], read and written under an exclusive lock on it; the
+expired ones are dropped whenever it is written.
+"""
+import fcntl
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+LEASE_SECONDS = 600
+
+
+class Leases:
+    def __init__(self, path: Path, lease_seconds: float = LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+
+    @contextmanager
+    def _locked(self, now: Optional[float]) -> Iterator[Dict[str, List]]:
+        # the live leases, written back, once the block is done, if it changed them
+        with open(self.path, "a+", encoding="utf-8") as f_leases:
+            fcntl.flock(f_leases, fcntl.LOCK_EX)
+            try:
+                f_leases.seek(0)
+                try:
+                    stored = json.loads(f_leases.read() or "{}")
+                except ValueError:
+                    # a write that didn't finish: its leases are lost, the records offered again
+                    stored = {}
+                now = time.time() if now is None else now
+                leases = {record_id: lease for record_id, lease in stored.items() if lease[1] > now}
+                yield leases
+                if leases != stored:
+                    f_leases.seek(0)
+                    f_leases.truncate()
+                    json.dump(leases, f_leases)
+                    f_leases.flush()
+            finally:
+                fcntl.flock(f_leases, fcntl.LOCK_UN)
+
+    def holder(self, record_id: str, now: Optional[float] = None) -> Optional[str]:
+        """The annotator holding a live lease on the record, if any"""
+        with self._locked(now) as leases:
+            lease = leases.get(record_id)
+        return None if lease is None else lease[0]
+
+    def available_to(self, record_id: str, annotator: str, now: Optional[float] = None) -> bool:
+        return self.holder(record_id, now) in (None, annotator)
+
+    def claim(self, record_ids: Iterable[str], annotator: str, limit: int, now: Optional[float] = None) -> List[str]:
+        """Leases, or renews the lease of, the first `limit` of `record_ids` not leased to
+        another annotator to `annotator`; returns them"""
+        now = time.time() if now is None else now
+        claimed: List[str] = []
+        if limit <= 0:
+            return claimed
+        with self._locked(now) as leases:
+            for record_id in record_ids:
+                if leases.get(record_id, [annotator])[0] != annotator:
+                    continue
+                leases[record_id] = [annotator, now + self.lease_seconds]
+                claimed.append(record_id)
+                if len(claimed) == limit:
+                    break
+        return claimed
+
+    def lease(self, record_id: str, annotator: str, now: Optional[float] = None) -> None:
+        """Leases, or renews the lease of, the record to `annotator`"""
+        with self._locked(now) as leases:
+            leases[record_id] = [annotator, (time.time() if now is None else now) + self.lease_seconds]
+
+    def release(self, record_id: str) -> None:
+        with self._locked(None) as leases:
+            leases.pop(record_id, None)
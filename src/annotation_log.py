@@ -0,0 +1,176 @@
+"""
+The annotations file, `annotations.jsonl`, one JSON line per submitted annotation, and
+what the annotator needs from it in memory: the ids of the records already annotated,
+and the totals /annotator/stats reports.
+
+Both are kept current by reading only what was appended to the file since the last read,
+by this or any other worker, so every worker reports the same totals; the file is read
+again from the start only when it was replaced or truncated.
+
+Annotations are written by a single writer per worker, GroupCommit, which appends all the
+submissions waiting for it in one write and one fsync, under an exclusive lock on the
+file: after catching up with the file, under that same lock, it tells whether a record
+was annotated by any worker.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+# a read of the file: its inode, the offsets read from and up to, the records read
+_Tail = Tuple[Optional[int], int, int, List[Dict[str, Any]]]
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {"total_annotated": 0, "total_skipped": 0, "by_rel_type": {}}
+
+
+class AnnotationLog:
+    def __init__(self, path: Path):
+        self.path = path
+        self.record_ids: Set[str] = set()
+        self._stats = _empty_stats()
+        self._offset = 0  # the lines before it are read
+        self._inode: Optional[int] = None
+        # requests and commits, in threads, read and write the file without it; it only
+        # guards the ids, the totals and the offset, and how far into the file they are
+        self._lock = threading.Lock()
+
+    def _count(self, record: Dict[str, Any]) -> None:
+        if record.get("action") == "skip":
+            self._stats["total_skipped"] += 1
+        else:
+            self._stats["total_annotated"] += 1
+            rel = record.get("rel_type", "other")
+            self._stats["by_rel_type"][rel] = self._stats["by_rel_type"].get(rel, 0) + 1
+
+    def _read(self, inode: Optional[int], offset: int) -> Optional[_Tail]:
+        # what the file whose inode is `inode` has past `offset`: read from the start if the
+        # file was replaced or truncated since, no records at all if it is gone, and None if
+        # there's nothing new
+        try:
+            f_in = open(self.path, "rb")
+        except FileNotFoundError:
+            return None if inode is None else (None, 0, 0, [])
+        with f_in:
+            stat = os.fstat(f_in.fileno())
+            if stat.st_ino != inode or stat.st_size < offset:
+                offset = 0
+            elif stat.st_size == offset:
+                return None
+            f_in.seek(offset)
+            tail = f_in.read()
+        start, records = offset, []
+        # a line without its newline is still being written, it is read next time
+        for line in tail[: tail.rfind(b"\n") + 1].splitlines(keepends=True):
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return stat.st_ino, start, offset, records
+
+    def load(self) -> None:
+        """Reads the whole file"""
+        with self._lock:
+            self._inode, self._offset = None, 0
+            self.record_ids.clear()
+            self._stats = _empty_stats()
+        self.catch_up()
+
+    def catch_up(self) -> None:
+        """Reads what was appended since the last read; starts over if the file was replaced"""
+        while True:
+            with self._lock:
+                inode, offset = self._inode, self._offset
+            read = self._read(inode, offset)
+            if read is None:
+                return
+            with self._lock:
+                if (self._inode, self._offset) != (inode, offset):
+                    # another thread got there first, what it read is counted: read on from it
+                    continue
+                new_inode, start, new_offset, records = read
+                if new_inode != inode or start < offset:
+                    self.record_ids.clear()
+                    self._stats = _empty_stats()
+                for record in records:
+                    if "record_id" in record:
+                        self.record_ids.add(record["record_id"])
+                    self._count(record)
+                self._inode, self._offset = new_inode, new_offset
+                return
+
+    def commit(self, records: List[Dict[str, Any]]) -> List[bool]:
+        """Appends the records not annotated yet, by any worker, in a single write and fsync;
+        returns, for each record, whether it was. Only one commit at a time, per process."""
+        with open(self.path, "ab") as f_out:
+            fcntl.flock(f_out, fcntl.LOCK_EX)
+            try:
+                self.catch_up()
+                committed, lines, ids = [], [], set()
+                with self._lock:
+                    for record in records:
+                        new = record["record_id"] not in self.record_ids and record["record_id"] not in ids
+                        committed.append(new)
+                        if new:
+                            ids.add(record["record_id"])
+                            lines.append(json.dumps(record).encode("utf-8") + b"\n")
+                    unread = os.fstat(f_out.fileno()).st_size > self._offset
+                if lines:
+                    if unread:
+                        # what's left unread is a line a crashed writer didn't finish
+                        lines.insert(0, b"\n")
+                    f_out.write(b"".join(lines))
+                    f_out.flush()
+                    os.fsync(f_out.fileno())
+                self.catch_up()
+            finally:
+                fcntl.flock(f_out, fcntl.LOCK_UN)
+        return committed
+
+    def stats(self) -> Dict[str, Any]:
+        """The totals, after catching up with the file: it reads the file, call it off the event loop"""
+        self.catch_up()
+        with self._lock:
+            return {**self._stats, "by_rel_type": dict(self._stats["by_rel_type"])}
+
+
+class GroupCommit:
+    """The single writer of an AnnotationLog: submissions arriving while a commit is under
+    way wait for it, and are committed together by the next one"""
+
+    def __init__(self, log: AnnotationLog):
+        self.log = log
+        self._pending: List[Tuple[Dict[str, Any], "asyncio.Future[bool]"]] = []
+        self._writer: Optional["asyncio.Future[None]"] = None
+
+    async def submit(self, record: Dict[str, Any]) -> bool:
+        """Commits the record, False if its record_id is already annotated"""
+        done = asyncio.get_running_loop().create_future()
+        self._pending.append((record, done))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write())
+        return await done
+
+    async def _write(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                committed = await loop.run_in_executor(None, self.log.commit, [record for record, _ in batch])
+            except Exception as error:  # pylint: disable=broad-except
+                for _, done in batch:
+                    # a submitter that was cancelled has stopped waiting
+                    if not done.done():
+                        done.set_exception(error)
+            else:
+                for (_, done), new in zip(batch, committed):
+                    if not done.done():
+                        done.set_result(new)
@@ -1,53 +1,112 @@
+import asyncio
+import base64
 import hashlib
 import json
-import math
 import os
 from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
-from typing import Optional, Set
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
-from cache import all_entities_info
+from annotation_leases import Leases
+from annotation_log import AnnotationLog, GroupCommit
+from cache import all_entities_info, dataset_version
+from jsonl_index import compute_entropy, open_index
 from sparql import get_all_relationships_paginated, get_relationship_by_url, get_total_relationships_count
+from suggest_index import entity_index
 
 router = APIRouter(prefix="/annotator", tags=["annotator"])
 
 ANNOTATIONS_FILE = Path(os.getenv("ANNOTATIONS_FILE", "./annotations.jsonl"))
-_annotated_ids: Set[str] = set()
+_annotations = AnnotationLog(ANNOTATIONS_FILE)
+_writer = GroupCommit(_annotations)
+# the same set, kept current by _annotations
+_annotated_ids = _annotations.record_ids
+# shared by every worker, next to the annotations
+_leases = Leases(ANNOTATIONS_FILE.with_name(ANNOTATIONS_FILE.name + ".leases"))
 
 
 def load_existing_annotations() -> None:
-    if not ANNOTATIONS_FILE.exists():
-        return
-    with open(ANNOTATIONS_FILE, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                record = json.loads(line)
-                if "record_id" in record:
-                    _annotated_ids.add(record["record_id"])
-            except json.JSONDecodeError:
-                pass
+    _annotations.load()
 
 
-# Load on module import so IDs are ready before any request arrives
+# Load on module import so IDs and stats are ready before any request arrives
 load_existing_annotations()
 
+# how many SPARQL pages, at most, are kept fetched ahead of their request
+MAX_PREFETCHED = 32
+
+# the SPARQL source's total, for the dataset version it was counted for
+_sparql_total: Dict[str, Any] = {"version": None, "total": 0}
+# (dataset version, cursor, limit) -> the SPARQL page after `cursor`, fetched ahead
+_prefetched: Dict[Tuple[str, str, int], "asyncio.Future[list]"] = {}
+
 
 def _record_id(url: str) -> str:
     return hashlib.sha256(url.encode()).hexdigest()
 
 
-def _compute_entropy(scores: dict) -> float:
-    entropy = 0.0
-    for p in scores.values():
-        if p > 0:
-            entropy -= p * math.log2(p)
-    return round(entropy, 4)
+def _encode_cursor(binding: dict) -> str:
+    key = [binding["arquivo_doc"]["value"], binding["rel"]["value"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf8")).decode("ascii")
+
+
+class InvalidCursorError(ValueError):
+    """A cursor /annotator/articles didn't make"""
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    """raises InvalidCursorError if `cursor` wasn't made by _encode_cursor()"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (UnicodeError, ValueError) as error:
+        raise InvalidCursorError(f"invalid cursor: {cursor}") from error
+    if not isinstance(key, list) or len(key) != 2 or not all(isinstance(part, str) for part in key):
+        raise InvalidCursorError(f"invalid cursor: {cursor}")
+    return key[0], key[1]
+
+
+async def _sparql_total_count() -> int:
+    # a full COUNT, run again only when the dataset changes
+    version = dataset_version()
+    if _sparql_total["version"] != version:
+        total = await asyncio.get_running_loop().run_in_executor(None, get_total_relationships_count)
+        _sparql_total.update(version=version, total=total)
+    return _sparql_total["total"]
+
+
+def _fetch_sparql_page(offset: int, limit: int, after: Optional[Tuple[str, str]]) -> "asyncio.Future[list]":
+    return asyncio.get_running_loop().run_in_executor(
+        None, partial(get_all_relationships_paginated, offset, limit, after)
+    )
+
+
+def _prefetch_sparql_page(cursor: str, limit: int) -> None:
+    key = (dataset_version(), cursor, limit)
+    if key in _prefetched:
+        return
+    while len(_prefetched) >= MAX_PREFETCHED:
+        # the oldest, its annotator has most likely moved on
+        del _prefetched[next(iter(_prefetched))]
+    page = _fetch_sparql_page(0, limit, _decode_cursor(cursor))
+    # a failed prefetch is only noticed, and fetched again, if its page is asked for
+    page.add_done_callback(lambda done: done.cancelled() or done.exception())
+    _prefetched[key] = page
+
+
+async def _sparql_page(cursor: Optional[str], offset: int, limit: int) -> list:
+    if cursor:
+        prefetched = _prefetched.pop((dataset_version(), cursor, limit), None)
+        if prefetched is not None:
+            try:
+                return await prefetched
+            except Exception:  # pylint: disable=broad-except
+                pass
+        return await _fetch_sparql_page(0, limit, _decode_cursor(cursor))
+    return await _fetch_sparql_page(offset, limit, None)
 
 
 def _normalize_sparql_record(e: dict) -> dict:
@@ -92,7 +151,7 @@ def _normalize_jsonl_record(record: dict) -> dict:
 
     arquivo_url = record.get("arquivo_url", "")
     predicted_scores = record.get("predicted_scores") or {}
-    entropy = _compute_entropy(predicted_scores) if predicted_scores else 0.0
+    entropy = compute_entropy(predicted_scores) if predicted_scores else 0.0
 
     return {
         "record_id": _record_id(arquivo_url),
@@ -121,13 +180,22 @@ async def get_articles(
     jsonl_path: Optional[str] = Query(None),
     offset: int = Query(default=0, ge=0),
     limit: int = Query(default=20, ge=1, le=100),
-    sort_by: str = Query(default="default", regex="^(default|uncertainty)$"),
+    sort_by: str = Query(default="default", regex="^(default|uncertainty|margin|least_confidence)$"),
+    cursor: Optional[str] = Query(default=None),
 ):
     if source == "sparql":
-        total = get_total_relationships_count()
-        bindings = get_all_relationships_paginated(offset=offset, limit=limit)
+        # with a cursor, the `next_cursor` of the previous page, `offset` isn't used: pages
+        # follow by keyset, and the next one is fetched while this one is being annotated
+        try:
+            bindings = await _sparql_page(cursor, offset, limit)
+        except InvalidCursorError as error:
+            raise HTTPException(status_code=400, detail=str(error)) from error
+        total = await _sparql_total_count()
+        next_cursor = _encode_cursor(bindings[-1]) if len(bindings) == limit else None
+        if next_cursor is not None:
+            _prefetch_sparql_page(next_cursor, limit)
         items = [_normalize_sparql_record(e) for e in bindings]
-        return {"total": total, "offset": offset, "items": items}
+        return {"total": total, "offset": offset, "items": items, "next_cursor": next_cursor}
 
     if not jsonl_path:
         raise HTTPException(status_code=400, detail="jsonl_path required when source=jsonl")
@@ -135,24 +203,7 @@ async def get_articles(
     if not path.exists():
         raise HTTPException(status_code=404, detail=f"File not found: {jsonl_path}")
 
-    with open(path, encoding="utf-8") as f:
-        all_records = [
-            r for line in f
-            if line.strip()
-            for r in [json.loads(line)]
-            if any(v > 0 for v in (r.get("predicted_scores") or {}).values())
-            and _record_id(r.get("arquivo_url", "")) not in _annotated_ids
-        ]
-
-    total = len(all_records)
-
-    if sort_by == "uncertainty":
-        for r in all_records:
-            scores = r.get("predicted_scores") or {}
-            r["_entropy"] = _compute_entropy(scores) if scores else 0.0
-        all_records.sort(key=lambda r: r["_entropy"], reverse=True)
-
-    page_records = all_records[offset: offset + limit]
+    total, page_records = open_index(jsonl_path).page(sort_by, offset, limit, excluded=_annotated_ids)
     items = [_normalize_jsonl_record(r) for r in page_records]
     return {"total": total, "offset": offset, "items": items}
 
@@ -174,35 +225,61 @@ async def get_article(
     path = Path(jsonl_path)
     if not path.exists():
         raise HTTPException(status_code=404, detail=f"File not found: {jsonl_path}")
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            record = json.loads(line)
-            if record.get("arquivo_url") == url:
-                return _normalize_jsonl_record(record)
+    record = open_index(jsonl_path).find(url)
+    if record is not None:
+        return _normalize_jsonl_record(record)
     raise HTTPException(status_code=404, detail="Article not found in JSONL file")
 
 
+def _lease_next(jsonl_path: str, sort_by: str, annotator: str, limit: int) -> List[dict]:
+    index = open_index(jsonl_path)
+    positions: Dict[str, int] = {}
+
+    def candidates() -> Iterator[str]:
+        for record_id, idx in index.listed(sort_by, excluded=_annotated_ids):
+            positions[record_id] = idx
+            yield record_id
+
+    return [_normalize_jsonl_record(index.record(positions[r])) for r in _leases.claim(candidates(), annotator, limit)]
+
+
+@router.get("/next")
+async def get_next_articles(
+    jsonl_path: str = Query(...),
+    annotator: str = Query(..., min_length=1),
+    limit: int = Query(default=1, ge=1, le=20),
+    sort_by: str = Query(default="uncertainty", regex="^(default|uncertainty|margin|least_confidence)$"),
+):
+    """The most uncertain records not yet annotated, nor leased to another annotator, leased
+    to `annotator` for the next LEASE_SECONDS; asking again renews them"""
+    path = Path(jsonl_path)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"File not found: {jsonl_path}")
+    # the leases are read and written under a file lock
+    items = await asyncio.get_running_loop().run_in_executor(
+        None, partial(_lease_next, jsonl_path, sort_by, annotator, limit)
+    )
+    return {"lease_seconds": _leases.lease_seconds, "items": items}
+
+
 @router.get("/entities")
 async def search_entities(
     q: str = Query(..., min_length=2),
     limit: int = Query(default=10, ge=1, le=50),
 ):
-    q_lower = q.lower()
-    matches = [
-        {
-            "wiki_id": wiki_id,
-            "name": info["name"],
-            "image_url": info.get("image_url", ""),
-            "nr_articles": info.get("nr_articles", 0),
-        }
-        for wiki_id, info in all_entities_info.items()
-        if q_lower in info.get("name", "").lower()
-    ]
-    matches.sort(key=lambda x: x["nr_articles"], reverse=True)
-    return {"results": matches[:limit]}
+    """Persons by name, see suggest_index: a 2-character `q` only matches at the start of a word"""
+    matches = entity_index.suggest(q, limit, entity_type="person")
+    return {
+        "results": [
+            {
+                "wiki_id": match["wiki_id"],
+                "name": match["name"],
+                "image_url": match["image_url"],
+                "nr_articles": match["nr_articles"],
+            }
+            for match in matches
+        ]
+    }
 
 
 class AnnotationPayload(BaseModel):
@@ -229,42 +306,23 @@ class AnnotationPayload(BaseModel):
 
 @router.post("/annotations")
 async def submit_annotation(payload: AnnotationPayload):
+    # what this worker knows: the commit checks again, against every worker's annotations
     if payload.record_id in _annotated_ids:
         raise HTTPException(status_code=409, detail="Record already annotated")
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, _leases.available_to, payload.record_id, payload.annotator):
+        raise HTTPException(status_code=409, detail="Record leased to another annotator")
 
     record = payload.dict()
     record["annotated_at"] = datetime.now(timezone.utc).isoformat()
 
-    with open(ANNOTATIONS_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record) + "\n")
-
-    _annotated_ids.add(payload.record_id)
+    if not await _writer.submit(record):
+        raise HTTPException(status_code=409, detail="Record already annotated")
+    await loop.run_in_executor(None, _leases.release, payload.record_id)
     return {"status": "ok", "record_id": payload.record_id}
 
 
 @router.get("/stats")
 async def get_stats():
-    if not ANNOTATIONS_FILE.exists():
-        return {"total_annotated": 0, "total_skipped": 0, "by_rel_type": {}}
-
-    total_annotated = 0
-    total_skipped = 0
-    by_rel_type: dict = {}
-
-    with open(ANNOTATIONS_FILE, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                record = json.loads(line)
-                if record.get("action") == "skip":
-                    total_skipped += 1
-                else:
-                    total_annotated += 1
-                    rel = record.get("rel_type", "other")
-                    by_rel_type[rel] = by_rel_type.get(rel, 0) + 1
-            except json.JSONDecodeError:
-                pass
-
-    return {"total_annotated": total_annotated, "total_skipped": total_skipped, "by_rel_type": by_rel_type}
+    # it reads what other workers appended to the file
+    return await asyncio.get_running_loop().run_in_executor(None, _annotations.stats)
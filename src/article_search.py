@@ -0,0 +1,97 @@
+"""
+/search: full-text search over the articles in `relationships.json`, ranked by the BM25
+segment generate_caches.py writes next to it (see text_search.py), and filtered by the
+relationships each article reports.
+"""
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from cache import all_entities_info, on_load, relationships
+from config import NO_IMAGE, STATIC_DATA
+from text_search import SearchSegment
+from utils import rel_type_matches
+
+SEGMENT_FILE = "search_index.bin"
+
+logger = logging.getLogger("uvicorn")
+
+_state: Dict[str, Any] = {"segment": None, "rows": []}
+
+
+def _rebuild() -> None:
+    # the previous segment isn't closed: a request may still be reading it, its mapping
+    # goes away with the last reference to it
+    path = STATIC_DATA + SEGMENT_FILE
+    if not os.path.exists(path):
+        logger.warning(f"{path} not found, /search is disabled until generate_caches.py builds it")
+        _state["segment"], _state["rows"] = None, []
+        return
+    segment = SearchSegment(path)
+    by_article: Dict[str, List[Dict[str, str]]] = {}
+    for row in relationships:
+        by_article.setdefault(row["arquivo_doc"], []).append(row)
+    # doc_id -> the article's relationships, empty for an article no longer in the cache
+    _state["segment"], _state["rows"] = segment, [by_article.get(key, []) for key in segment.keys]
+
+
+def available() -> bool:
+    return _state["segment"] is not None
+
+
+def search_articles(
+    query: str,
+    person: Optional[str] = None,
+    rel_type: Optional[str] = None,
+    start_year: Optional[str] = None,
+    end_year: Optional[str] = None,
+    k: int = 20,
+) -> List[Dict[str, Any]]:
+    """The `k` articles that best match `query`, best first, each with the relationships it
+    reports; with filters, only articles reporting one relationship that passes all of them:
+    involving `person`, of `rel_type` (as utils.rel_type_matches reads it), within the years."""
+    segment, rows_by_doc = _state["segment"], _state["rows"]
+    if segment is None:
+        return []
+
+    def matching(doc_id: int) -> List[Dict[str, str]]:
+        return [
+            row
+            for row in rows_by_doc[doc_id]
+            if (person is None or person in (row["ent1_id"], row["ent2_id"]))
+            and rel_type_matches(rel_type, row["rel_type"])
+            and (start_year is None or row["date"][:4] >= start_year)
+            and (end_year is None or row["date"][:4] <= end_year)
+        ]
+
+    results = []
+    for doc_id, score in segment.search(query, k, accept=lambda doc_id: bool(matching(doc_id))):
+        rows = matching(doc_id)
+        article = rows[0]
+        results.append(
+            {
+                "arquivo_doc": article["arquivo_doc"],
+                "date": article["date"].split("T")[0],
+                "title": article["title"],
+                "domain": article["domain"],
+                "original_url": article["original_url"],
+                "paragraph": article["paragraph"],
+                "score": round(score, 4),
+                "relationships": [
+                    {
+                        "rel_type": row["rel_type"],
+                        "ent1_id": row["ent1_id"],
+                        "ent1_str": row["ent1_str"],
+                        "ent1_img": all_entities_info.get(row["ent1_id"], {}).get("image_url", NO_IMAGE),
+                        "ent2_id": row["ent2_id"],
+                        "ent2_str": row["ent2_str"],
+                        "ent2_img": all_entities_info.get(row["ent2_id"], {}).get("image_url", NO_IMAGE),
+                    }
+                    for row in rows
+                ],
+            }
+        )
+    return results
+
+
+on_load(_rebuild)
@@ -1,17 +1,118 @@
+import hashlib
 import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Literal
 
-with open("json/all_entities_info.json", encoding="utf8") as f_in:
-    all_entities_info = json.load(f_in)
+from config import STATIC_DATA
 
-with open("json/all_parties_info.json", encoding="utf8") as f_in:
-    all_parties_info = json.load(f_in)
+all_entities_info: Dict[str, Any] = {}
+all_parties_info: List[Dict[str, Any]] = []
+persons: List[Dict[str, str]] = []
+parties: List[Dict[str, str]] = []
+chave_publico: List[Dict[str, Any]] = []
+party_members: Dict[str, List[str]] = {}
+relationships: List[Dict[str, str]] = []
+# see generate_caches.facets_json_cache: "facets", "labels" and "names"
+facets: Dict[str, Any] = {}
 
-with open("json/persons.json", encoding="utf8") as f_in:
-    persons = json.load(f_in)
+EntityType = Literal["person", "party"]
 
-with open("json/parties.json", encoding="utf8") as f_in:
-    parties = json.load(f_in)
+# wiki_id -> "person" | "party", for every entity in the two files above. `get_info` used
+# to answer this by walking all_parties_info and then every key of all_entities_info,
+# twice per /queries request; a dict built once per load makes it a single lookup.
+entity_types: Dict[str, EntityType] = {}
 
-with open("json/CHAVE-Publico_94_95.jsonl", encoding="utf8") as f_in:
-    chave_publico = [json.loads(line) for line in f_in]
+# person wiki_id -> wiki_ids of the parties it is affiliated with, the inverse of party_members
+member_parties: Dict[str, List[str]] = {}
 
+_load_hooks: List[Callable[[], None]] = []
+_version = {"dataset": ""}
+
+_CACHE_FILES = [
+    "all_entities_info.json",
+    "all_parties_info.json",
+    "persons.json",
+    "parties.json",
+    "CHAVE-Publico_94_95.jsonl",
+]
+
+# written by newer versions of generate_caches.py: without them the API still starts, with
+# the routes built on them returning nothing until the caches are generated again
+_OPTIONAL_CACHE_FILES = [
+    "party_members.json",
+    "facets.json",
+    "relationships.json",
+]
+
+logger = logging.getLogger("uvicorn")
+
+
+def _read_json(f_name: str) -> Any:
+    with open(STATIC_DATA + f_name, encoding="utf8") as f_in:
+        return json.load(f_in)
+
+
+def _read_optional_json(f_name: str, default: Any) -> Any:
+    if not os.path.exists(STATIC_DATA + f_name):
+        logger.warning(f"{STATIC_DATA + f_name} not found, run generate_caches.py to create it")
+        return default
+    return _read_json(f_name)
+
+
+def load() -> None:
+    """(Re)reads the JSON files written by generate_caches.py and rebuilds the indexes
+    derived from them; call it again to pick up regenerated caches without a restart.
+
+    Everything is updated in place rather than rebound: other modules hold on to these
+    objects through `from cache import ...`, and a rebind would leave them with the old
+    data after a reload."""
+    stats = [os.stat(STATIC_DATA + f_name) for f_name in _CACHE_FILES]
+    stats += [os.stat(STATIC_DATA + f_name) for f_name in _OPTIONAL_CACHE_FILES if os.path.exists(STATIC_DATA + f_name)]
+    _version["dataset"] = hashlib.sha1(repr([(st.st_size, st.st_mtime_ns) for st in stats]).encode()).hexdigest()[:16]
+
+    all_entities_info.clear()
+    all_entities_info.update(_read_json("all_entities_info.json"))
+    all_parties_info[:] = _read_json("all_parties_info.json")
+    persons[:] = _read_json("persons.json")
+    parties[:] = _read_json("parties.json")
+    with open(STATIC_DATA + "CHAVE-Publico_94_95.jsonl", encoding="utf8") as f_in:
+        chave_publico[:] = [json.loads(line) for line in f_in]
+    party_members.clear()
+    party_members.update(_read_optional_json("party_members.json", {}))
+    relationships[:] = _read_optional_json("relationships.json", [])
+    facets.clear()
+    facets.update(_read_optional_json("facets.json", {}))
+
+    # parties are written last so that they win, as they did in the old linear scan
+    types: Dict[str, EntityType] = {wiki_id: "person" for wiki_id in all_entities_info}
+    types.update({entry["wiki_id"]: "party" for entry in all_parties_info})
+    entity_types.clear()
+    entity_types.update(types)
+
+    affiliations: Dict[str, List[str]] = {}
+    for party, members in party_members.items():
+        for member in members:
+            affiliations.setdefault(member, []).append(party)
+    member_parties.clear()
+    member_parties.update(affiliations)
+
+    for hook in _load_hooks:
+        hook()
+
+
+def dataset_version() -> str:
+    """Changes whenever load() reads cache files different from the previous ones; what
+    anything derived from the cache, e.g. serialized responses, can be keyed on."""
+    return _version["dataset"]
+
+
+def on_load(hook: Callable[[], None]) -> None:
+    """Registers `hook` to rebuild something derived from the cache, e.g. an index, every
+    time the cache is (re)loaded. It also runs once right away, since the first load
+    happens as soon as this module is imported."""
+    _load_hooks.append(hook)
+    hook()
+
+
+load()
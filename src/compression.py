@@ -0,0 +1,161 @@
+"""
+Response compression: content negotiation on Accept-Encoding, helpers to store a payload
+pre-compressed once at the highest level (see responses.CachedJSON) and an ASGI middleware
+that compresses everything else on the fly, above a size threshold.
+
+Pre-compressed payloads come in brotli and gzip, the middleware only does gzip.
+"""
+import gzip
+import logging
+import time
+import zlib
+from typing import Any, Dict, Optional, Sequence
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("uvicorn")
+
+# most preferred first, when a client accepts several with the same q-value
+PRECOMPRESSED_ENCODINGS = ("br", "gzip")
+MINIMUM_SIZE = 1024
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# what compressing on the fly has cost so far, per encoding
+stats: Dict[str, Dict[str, float]] = {}
+
+
+def negotiate(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """Picks from `available` the encoding the client prefers, by q-value and then by the
+    order of `available`; None means the response goes out uncompressed."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int = 9) -> bytes:
+    if encoding == "br":
+        # quality 11 is brotli's highest, the equivalent of gzip's 9
+        return brotli.compress(body, quality=11 if level >= 9 else level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _record(encoding: str, size_in: int, size_out: int, cpu_time: float) -> None:
+    entry = stats.setdefault(encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_time": 0.0})
+    entry["responses"] += 1
+    entry["bytes_in"] += size_in
+    entry["bytes_out"] += size_out
+    entry["cpu_time"] += cpu_time
+    logger.debug(
+        f"{encoding}: {size_in} -> {size_out} bytes ({size_out / max(size_in, 1):.2f}) in {cpu_time * 1000:.1f}ms"
+    )
+
+
+class CompressionMiddleware:
+    """gzip for responses built per request. Responses that already carry a
+    Content-Encoding, i.e. the pre-compressed ones, go through untouched, as do bodies
+    smaller than `minimum_size`. Streamed bodies are compressed chunk by chunk, flushing
+    after each one so that the client can start reading before the stream ends."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE, level: int = 6) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or negotiate(Headers(scope=scope).get("accept-encoding", ""), ("gzip",)) is None:
+            await self.app(scope, receive, send)
+            return
+        await _GzipResponder(self.minimum_size, self.level, send).run(self.app, scope, receive)
+
+
+class _GzipResponder:
+    def __init__(self, minimum_size: int, level: int, send: Send) -> None:
+        self.minimum_size = minimum_size
+        self.level = level
+        self.send = send
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[Any] = None
+        self.size_in = 0
+        self.size_out = 0
+        self.cpu_time = 0.0
+
+    async def run(self, app: ASGIApp, scope: Scope, receive: Receive) -> None:
+        await app(scope, receive, self.on_message)
+
+    async def on_message(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._flush_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None and not more_body:
+            await self._send_whole(body)
+            return
+
+        started = time.process_time()
+        if self.compressor is None:
+            # streaming: the length is unknown up front
+            self.compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            headers = self._compressed_headers()
+            del headers["content-length"]
+        chunk = self.compressor.compress(body)
+        chunk += self.compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+        self.cpu_time += time.process_time() - started
+        self.size_in += len(body)
+        self.size_out += len(chunk)
+        await self._flush_start()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+        if not more_body:
+            _record("gzip", self.size_in, self.size_out, self.cpu_time)
+
+    async def _send_whole(self, body: bytes) -> None:
+        if len(body) < self.minimum_size:
+            await self._flush_start()
+            await self.send({"type": "http.response.body", "body": body})
+            return
+        started = time.process_time()
+        compressed = gzip.compress(body, compresslevel=self.level, mtime=0)
+        cpu_time = time.process_time() - started
+        headers = self._compressed_headers()
+        headers["Content-Length"] = str(len(compressed))
+        headers.append("Server-Timing", f"gzip;dur={cpu_time * 1000:.2f}")
+        _record("gzip", len(body), len(compressed), cpu_time)
+        await self._flush_start()
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    def _compressed_headers(self) -> MutableHeaders:
+        assert self.start_message is not None
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = "gzip"
+        headers.add_vary_header("Accept-Encoding")
+        return headers
+
+    async def _flush_start(self) -> None:
+        if self.start_message is not None:
+            await self.send(self.start_message)
+            self.start_message = None
@@ -1,5 +1,6 @@
 import os
-from pathlib import Path
+import time
+from typing import Any, Dict
 
 es_haystack = os.getenv("ES_HAYSTACK", default=None)
 sparql_endpoint = os.getenv("SPARQL_ENDPOINT", default=None)
@@ -11,6 +12,47 @@ LANG = "pt"
 NO_IMAGE = "/assets/images/logos/no_picture.jpg"  # the file lives under logos/
 PARTY_LOGO_DIR = "assets/images/parties"
 _PARTY_LOGO_PREFERENCE = (".svg", ".png", ".jpg", ".jpeg", ".gif")
+# how often, at most, the logos' directory is checked for changes
+PARTY_LOGO_RECHECK_SECONDS = 5.0
+
+# wiki_id -> logo URL, for the directory as of its modification time `mtime`
+_party_logos: Dict[str, Any] = {"folder": None, "mtime": None, "checked": 0.0, "logos": {}}
+
+
+def _scan_party_logos(folder: str) -> Dict[str, str]:
+    found: Dict[str, Dict[str, str]] = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            wiki_id, dot, _ = entry.name.partition(".")
+            if dot and entry.is_file():
+                suffix = os.path.splitext(entry.name)[1].lower()
+                found.setdefault(wiki_id, {})[suffix] = entry.name
+    logos = {}
+    for wiki_id, by_suffix in found.items():
+        best = next((by_suffix[suffix] for suffix in _PARTY_LOGO_PREFERENCE if suffix in by_suffix), None)
+        logos[wiki_id] = f"/{folder}/{best or sorted(by_suffix.values())[0]}"
+    return logos
+
+
+def _party_logo_map() -> Dict[str, str]:
+    """The logos in PARTY_LOGO_DIR, scanned again only when the directory's mtime changed,
+    i.e.: files were added, removed or renamed, and that checked at most once every
+    PARTY_LOGO_RECHECK_SECONDS; between checks it costs no system calls at all."""
+    now = time.monotonic()
+    if _party_logos["folder"] == PARTY_LOGO_DIR and now - _party_logos["checked"] < PARTY_LOGO_RECHECK_SECONDS:
+        return _party_logos["logos"]
+    try:
+        mtime = os.stat(PARTY_LOGO_DIR).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _party_logos["folder"] != PARTY_LOGO_DIR or mtime != _party_logos["mtime"]:
+        try:
+            logos = _scan_party_logos(PARTY_LOGO_DIR)
+        except OSError:
+            logos = {}
+        _party_logos.update(folder=PARTY_LOGO_DIR, mtime=mtime, logos=logos)
+    _party_logos["checked"] = now
+    return _party_logos["logos"]
 
 
 def party_logo_url(wiki_id: str) -> str:
@@ -23,15 +65,9 @@ def party_logo_url(wiki_id: str) -> str:
 
     Unlike portraits, party logos keep their original extension (SVG scales and is
     the best choice for a logo), so the extension is looked up on disk instead of
-    guessed. 11 parties have a file under two extensions; SVG wins.
+    guessed. 11 parties have a file under two extensions; SVG wins. The directory is
+    read once into a wiki_id -> logo map, see _party_logo_map().
     """
-    folder = Path(PARTY_LOGO_DIR)
-    found = {f.suffix.lower(): f.name for f in folder.glob(f"{wiki_id}.*")} if folder.is_dir() else {}
-    for suffix in _PARTY_LOGO_PREFERENCE:
-        if suffix in found:
-            return f"/{PARTY_LOGO_DIR}/{found[suffix]}"
-    if found:
-        return f"/{PARTY_LOGO_DIR}/{sorted(found.values())[0]}"
-    return NO_IMAGE
-STATIC_DATA = "json/"
+    return _party_logo_map().get(wiki_id, NO_IMAGE)
+STATIC_DATA = os.getenv("STATIC_DATA", default="json/")
 ENTITIES_BATCH_SIZE = 16  # number of entity cards to read in batch when scrolling down
@@ -0,0 +1,194 @@
+"""
+The /personalities/{facet}/{wiki_id} routes, answered from `facets.json` (see
+generate_caches.py) instead of one Wikidata query per request, and /facets, a search
+combining several facets at once.
+
+The results keep the shape of the SPARQL bindings those queries returned, which is what
+the frontend reads: {"ent1": {"value": <entity URI>}, "ent1_name": {...}, "image_url":
+{...}, "nr_articles": ...}, plus "entity_label" for education and occupation, sorted by
+name and without the persons that have no support/opposition articles.
+"""
+import heapq
+from array import array
+from collections import Counter
+from itertools import chain
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from cache import all_entities_info, all_parties_info, facets, on_load
+from config import NO_IMAGE
+
+FACETS = ("education", "occupation", "public_office", "government", "assembly", "party")
+
+# the facets whose results carry the label of the value they were asked for
+_LABELLED = {"education", "occupation"}
+
+_ENTITY_URI = "http://www.wikidata.org/entity/"
+
+# facet -> value wiki_id -> results, ready to be returned
+_results: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+
+# For /facets the persons are numbered, most articles first, and each facet value keeps
+# the sorted numbers of its persons: OR and AND of values are unions and intersections of
+# those, and a sorted selection is already in the order results are returned. Each person
+# also keeps the numbers of its (facet, value) pairs, the counts of a selection are a tally
+# over them, or, for a selection of most persons, the pairs' totals minus a tally over the
+# persons left out; with no filters at all, the counts are the ones computed here.
+_persons: List[str] = []
+_members: Dict[str, Dict[str, array]] = {}
+_pairs: List[Tuple[str, str]] = []
+_memberships: List[array] = []
+_totals: List[int] = []
+_counts: Dict[str, List[Tuple[str, int]]] = {}
+_labels: Dict[str, str] = {}
+
+
+def _nr_relation_articles(info: Dict[str, Any]) -> int:
+    return info.get("nr_articles", 0) - info.get("nr_articles_by_type", {}).get("other", 0)
+
+
+def _binding(person: str, name: str, entity_label: Optional[str]) -> Dict[str, Any]:
+    info = all_entities_info.get(person, {})
+    binding: Dict[str, Any] = {
+        "ent1": {"type": "uri", "value": _ENTITY_URI + person},
+        "ent1_name": {"type": "literal", "xml:lang": "pt", "value": name},
+    }
+    if entity_label is not None:
+        binding["entity_label"] = {"type": "literal", "xml:lang": "pt", "value": entity_label}
+    binding["image_url"] = {"type": "uri", "value": info.get("image_url", NO_IMAGE)}
+    binding["nr_articles"] = _nr_relation_articles(info)
+    return binding
+
+
+def _top_counts(counts: Dict[str, int], n: Optional[int] = None) -> List[Tuple[str, int]]:
+    # most frequent first, ties by wiki_id
+    if n is None:
+        return sorted(counts.items(), key=lambda x: (-x[1], x[0]))
+    return heapq.nsmallest(n, counts.items(), key=lambda x: (-x[1], x[0]))
+
+
+def _rebuild() -> None:
+    global _results, _persons, _members, _pairs, _memberships, _totals, _counts, _labels
+    names, labels = facets.get("names", {}), facets.get("labels", {})
+    results: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for facet in FACETS:
+        by_value = results[facet] = {}
+        for value, persons in facets.get("facets", {}).get(facet, {}).items():
+            if facet in _LABELLED and value not in labels:
+                # those queries only matched values with a Portuguese label
+                continue
+            entity_label = labels[value] if facet in _LABELLED else None
+            entries = [
+                _binding(person, names[person], entity_label)
+                for person in persons
+                if person in names and _nr_relation_articles(all_entities_info.get(person, {})) > 0
+            ]
+            by_value[value] = sorted(entries, key=lambda x: x["ent1_name"]["value"])
+
+    members = {
+        facet: {
+            value: [entry["ent1"]["value"][len(_ENTITY_URI) :] for entry in entries]
+            for value, entries in by_value.items()
+        }
+        for facet, by_value in results.items()
+    }
+    listed = {person for by_value in members.values() for persons in by_value.values() for person in persons}
+    persons = sorted(listed, key=lambda person: (-_nr_relation_articles(all_entities_info[person]), person))
+    number = {person: idx for idx, person in enumerate(persons)}
+    numbers: Dict[str, Dict[str, array]] = {}
+    pairs: List[Tuple[str, str]] = []
+    memberships = [array("I") for _ in persons]
+    for facet, by_value in members.items():
+        numbers[facet] = {}
+        for value, value_persons in by_value.items():
+            if value_persons:
+                numbers[facet][value] = array("I", sorted(number[person] for person in value_persons))
+                for person in value_persons:
+                    memberships[number[person]].append(len(pairs))
+                pairs.append((facet, value))
+    counts = {
+        facet: _top_counts({value: len(value_numbers) for value, value_numbers in by_value.items()})
+        for facet, by_value in numbers.items()
+    }
+    # parties without a Portuguese label in facets.json still have one in all_parties_info
+    all_labels = {entry["wiki_id"]: entry["party_label"] for entry in all_parties_info}
+    all_labels.update(labels)
+    _results, _persons, _members, _labels = results, persons, numbers, all_labels
+    _pairs, _memberships, _counts = pairs, memberships, counts
+    _totals = [len(numbers[facet][value]) for facet, value in pairs]
+
+
+def get_personalities_by_facet(facet: str, wiki_id: str) -> List[Dict[str, Any]]:
+    """The persons with `wiki_id` as their `facet`, one of FACETS, e.g.: everyone educated
+    at a given university, or every member of a party"""
+    return _results.get(facet, {}).get(wiki_id, [])
+
+
+def _select(filters: Dict[str, List[str]], match_all: bool) -> Optional[List[int]]:
+    # the sorted numbers of the persons matching `filters`, None for everyone
+    selected: Optional[Set[int]] = None
+    for facet, values in filters.items():
+        members = _members.get(facet, {})
+        value_numbers = sorted((members.get(value, array("I")) for value in values), key=len)
+        if match_all:
+            if not value_numbers:
+                continue
+            combined = set(value_numbers[0]).intersection(*value_numbers[1:])
+        else:
+            combined = set(chain.from_iterable(value_numbers))
+        selected = combined if selected is None else selected & combined
+        if not selected:
+            return []
+    return None if selected is None else sorted(selected)
+
+
+def _tally(selected: List[int]) -> Dict[int, int]:
+    # pair number -> how many of the selected persons have it
+    if 2 * len(selected) <= len(_persons):
+        return Counter(chain.from_iterable(_memberships[idx] for idx in selected))
+    left_out = set(range(len(_persons))).difference(selected)
+    tally = Counter(chain.from_iterable(_memberships[idx] for idx in left_out))
+    return {pair: total - tally[pair] for pair, total in enumerate(_totals) if total > tally[pair]}
+
+
+def search_persons(
+    filters: Dict[str, List[str]], match_all: bool = False, offset: int = 0, limit: int = 32, nr_counts: int = 20
+) -> Dict[str, Any]:
+    """The persons matching `filters`, facet -> values: any of the values of a facet, or all
+    of them with `match_all`, and every facet given. Persons come most articles first, with
+    `offset` and `limit`; 'counts' has, for each facet, the values most frequent among
+    them (at most `nr_counts`) with how many of them have each."""
+    selected = _select(filters, match_all)
+    if selected is None:
+        total, page = len(_persons), range(offset, min(offset + limit, len(_persons)))
+        counts = {facet: values[:nr_counts] for facet, values in _counts.items()}
+    else:
+        total, page = len(selected), selected[offset : offset + limit]
+        by_facet: Dict[str, Dict[str, int]] = {facet: {} for facet in _members}
+        for pair, count in _tally(selected).items():
+            facet, value = _pairs[pair]
+            by_facet[facet][value] = count
+        counts = {facet: _top_counts(values, nr_counts) for facet, values in by_facet.items()}
+
+    items = []
+    for idx in page:
+        person = _persons[idx]
+        info = all_entities_info.get(person, {})
+        items.append(
+            {
+                "wiki_id": person,
+                "name": facets["names"][person],
+                "image_url": info.get("image_url", NO_IMAGE),
+                "nr_articles": _nr_relation_articles(info),
+            }
+        )
+    return {
+        "total": total,
+        "items": items,
+        "counts": {
+            facet: [{"wiki_id": value, "label": _labels.get(value, value), "count": count} for value, count in values]
+            for facet, values in counts.items()
+        },
+    }
+
+
+on_load(_rebuild)
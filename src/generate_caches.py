@@ -3,7 +3,7 @@ from collections import defaultdict
 from pathlib import Path
 from random import randint
 from time import sleep
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 import requests
 from requests import RequestException
@@ -11,11 +11,16 @@ from requests import RequestException
 from config import STATIC_DATA, NO_IMAGE
 from sparql_queries_cache import (
     get_all_parties_and_members_with_relationships,
+    get_all_relationships,
+    get_persons_facets,
+    get_persons_party_affiliations,
+    get_persons_profiles,
     get_persons_wiki_id_name_image_url,
     get_total_nr_articles_for_each_person,
     get_all_parties_images,
     get_all_persons_images,
 )
+from text_search import write_segment
 
 
 def just_sleep(lower_bound=1, upper_bound=3, verbose=False):
@@ -120,6 +125,76 @@ def parties_json_cache():
     return {x["wiki_id"] for x in parties_data}
 
 
+def party_members_json_cache(person_wiki_ids: set):
+    """
+    'party_members.json': party wiki_id -> wiki_ids of its members. Party-level queries in
+    the API used to ask Wikidata for the members of both parties on every request.
+    """
+    party_members = get_persons_party_affiliations(person_wiki_ids)
+    print(f"{sum(len(v) for v in party_members.values())} party affiliations")
+    with open(STATIC_DATA + "party_members.json", "wt", encoding="utf8") as f_out:
+        json.dump(party_members, f_out)
+
+
+def facets_json_cache(person_wiki_ids: set):
+    """
+    'facets.json': for each facet (education, occupation, public_office, government, assembly
+    and party) value wiki_id -> wiki_ids of the persons with it, plus the labels of the values
+    and persons; the /personalities/{facet}/{wiki_id} routes used to query Wikidata each time.
+    """
+    facets = get_persons_facets(person_wiki_ids)
+    for facet, values in facets["facets"].items():
+        print(f"{facet}: {len(values)} values, {sum(len(v) for v in values.values())} persons")
+    with open(STATIC_DATA + "facets.json", "wt", encoding="utf8") as f_out:
+        json.dump(facets, f_out)
+
+
+def profiles_cache(all_politiquices_per: Dict[str, Any]):
+    """
+    'profiles.jsonl': one line per person with what /personality/{wiki_id} shows from Wikidata,
+    i.e.: name, image, parties (with their logos resolved), positions, education, occupations,
+    governments and assemblies, instead of six Wikidata queries per request.
+    'profiles_index.json': wiki_id -> [offset, length] of its line, for random access.
+    """
+    profiles = get_persons_profiles(set(all_politiquices_per.keys()))
+    index = {}
+    with open(STATIC_DATA + "profiles.jsonl", "wb") as f_out:
+        for wiki_id, profile in profiles.items():
+            info = all_politiquices_per[wiki_id]
+            line = json.dumps({"wiki_id": wiki_id, "name": info["name"], "image_url": info["image_url"], **profile})
+            data = line.encode("utf8") + b"\n"
+            index[wiki_id] = [f_out.tell(), len(data)]
+            f_out.write(data)
+    with open(STATIC_DATA + "profiles_index.json", "wt", encoding="utf8") as f_out:
+        json.dump(index, f_out)
+    print(f"{len(index)} profiles")
+
+
+def relationships_json_cache():
+    """
+    'relationships.json': every relationship together with its article, so that the API can
+    aggregate over groups of persons (e.g.: party members) without one SPARQL query per group.
+    """
+    relationships = get_all_relationships()
+    print(f"{len(relationships)} relationships")
+    with open(STATIC_DATA + "relationships.json", "wt", encoding="utf8") as f_out:
+        json.dump(relationships, f_out)
+    return relationships
+
+
+def search_index_json_cache(relationships: List[Dict[str, str]]):
+    """
+    'search_index.bin': BM25 inverted index over the title and paragraph of each article in
+    'relationships.json', see text_search.py; the API maps it into memory for /search.
+    """
+    articles = {}
+    for row in relationships:
+        if row["arquivo_doc"] not in articles:
+            articles[row["arquivo_doc"]] = row["title"] + "\n" + row["paragraph"]
+    nr_docs = write_segment(articles.items(), STATIC_DATA + "search_index.bin")
+    print(f"{nr_docs} articles indexed for full-text search")
+
+
 def save_images_from_url(wiki_id_info: Dict[str, Any], base_out: str, max_retries: int = 5):
     headers = {
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -184,15 +259,27 @@ def get_images(party_wiki_ids: set):
 
 def main():
     print("Caching and pre-computing static information")
-    personalities_json_cache()
+    all_politiquices_per = personalities_json_cache()
     party_wiki_ids = parties_json_cache()
+    party_members_json_cache(set(all_politiquices_per.keys()))
+    facets_json_cache(set(all_politiquices_per.keys()))
+    relationships = relationships_json_cache()
+    search_index_json_cache(relationships)
     get_images(party_wiki_ids)
+    # after the images: the parties' logos are resolved to the files just downloaded
+    profiles_cache(all_politiquices_per)
 
     generated_files = [
         STATIC_DATA + "all_entities_info.json",
         STATIC_DATA + "persons.json",
         STATIC_DATA + "all_parties_info.json",
         STATIC_DATA + "parties.json",
+        STATIC_DATA + "party_members.json",
+        STATIC_DATA + "facets.json",
+        STATIC_DATA + "relationships.json",
+        STATIC_DATA + "search_index.bin",
+        STATIC_DATA + "profiles.jsonl",
+        STATIC_DATA + "profiles_index.json",
     ]
     print("\nGenerated files:")
     for path in generated_files:
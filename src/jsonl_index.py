@@ -0,0 +1,299 @@
+"""
+A sidecar index for the annotator's JSONL predictions files, so /annotator/articles and
+/annotator/article cost O(page) instead of parsing the whole file on every request.
+
+The index lives next to the file, as `<file>.idx`, and records the file's size and mtime:
+when either changes it is rebuilt, in a single pass over the file. Both the file and its
+index are memory-mapped; a page is a few positioned slices of the file, decoded as asked.
+
+Index layout, native byte order (the marker tells a foreign one, which is just rebuilt),
+every section padded to 8 bytes:
+
+    header      b"PQJX", version, marker, file size, file mtime_ns, nr_records, nr_orders
+    starts      nr_records uint64, where each record's line starts in the file
+    lengths     nr_records uint32, the line's length, without the newline
+    digests     nr_records * 32 bytes, the record's id: sha256 of its arquivo_url
+    by_digest   nr_records uint32, the records sorted by digest, then by position
+    orders      nr_orders times: name (16 bytes), count, the count records in that order,
+                and nr_records uint32, each record's position in it (NOT_LISTED if none)
+
+The orders only list the records with some positive predicted score, the ones offered
+for annotation: "default" in file order, then most uncertain first, by one of three
+measures, all computed once, when the index is built: "uncertainty", the entropy of the
+scores, "margin", how little the best score beats the second, and "least_confidence",
+how far the best score is from 1.
+"""
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+_HEADER = struct.Struct("=4sIIQqII")
+_ORDER_HEADER = struct.Struct("=16sI4x")
+_MAGIC = b"PQJX"
+_VERSION = 2
+_MARKER = 0x01020304
+_DIGEST_SIZE = 32
+
+NOT_LISTED = 0xFFFFFFFF
+ORDERS = ("default", "uncertainty", "margin", "least_confidence")
+
+logger = logging.getLogger("uvicorn")
+
+
+def compute_entropy(scores: Dict[str, float]) -> float:
+    entropy = 0.0
+    for p in scores.values():
+        if p > 0:
+            entropy -= p * math.log2(p)
+    return round(entropy, 4)
+
+
+def compute_margin(scores: Dict[str, float]) -> float:
+    best, second = (sorted(scores.values(), reverse=True) + [0.0, 0.0])[:2]
+    return round(best - second, 4)
+
+
+def compute_least_confidence(scores: Dict[str, float]) -> float:
+    return round(1 - max(scores.values()), 4)
+
+
+def _padded(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 8)
+
+
+def _uints(typecode: str, values: Iterable[int]) -> bytes:
+    return _padded(array(typecode, values).tobytes())
+
+
+def _build(path: str, size: int, mtime_ns: int) -> bytes:
+    starts: List[int] = []
+    lengths: List[int] = []
+    digests: List[bytes] = []
+    # record -> (entropy, margin, least confidence), for the listed records
+    uncertainty: Dict[int, Tuple[float, float, float]] = {}
+    with open(path, "rb") as f_in:
+        position = 0
+        for line in f_in:
+            start, position = position, position + len(line)
+            content = line.rstrip(b"\r\n")
+            if not content.strip():
+                continue
+            try:
+                record = json.loads(content)
+            except json.JSONDecodeError:
+                logger.warning(f"{path}: skipping the invalid JSON line at byte {start}")
+                continue
+            idx = len(starts)
+            starts.append(start)
+            lengths.append(len(content))
+            digests.append(hashlib.sha256(record.get("arquivo_url", "").encode()).digest())
+            scores = record.get("predicted_scores") or {}
+            if any(v > 0 for v in scores.values()):
+                uncertainty[idx] = (compute_entropy(scores), compute_margin(scores), compute_least_confidence(scores))
+
+    nr_records = len(starts)
+    listed = sorted(uncertainty)
+    # sorts are stable, ties keep the file order
+    orders = {
+        "default": listed,
+        "uncertainty": sorted(listed, key=lambda idx: -uncertainty[idx][0]),
+        "margin": sorted(listed, key=lambda idx: uncertainty[idx][1]),
+        "least_confidence": sorted(listed, key=lambda idx: -uncertainty[idx][2]),
+    }
+    sections = [
+        _padded(_HEADER.pack(_MAGIC, _VERSION, _MARKER, size, mtime_ns, nr_records, len(orders))),
+        _uints("Q", starts),
+        _uints("I", lengths),
+        b"".join(digests),
+        _uints("I", sorted(range(nr_records), key=lambda idx: digests[idx])),
+    ]
+    for name, sequence in orders.items():
+        rank = array("I", [NOT_LISTED]) * nr_records
+        for pos, idx in enumerate(sequence):
+            rank[idx] = pos
+        sections.extend(
+            [_ORDER_HEADER.pack(name.encode(), len(sequence)), _uints("I", sequence), _padded(rank.tobytes())]
+        )
+    return b"".join(sections)
+
+
+def _map(path: str) -> Any:
+    with open(path, "rb") as f_in:
+        if os.fstat(f_in.fileno()).st_size == 0:
+            return b""  # an empty file can't be mapped
+        return mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _section(view: memoryview, position: int, typecode: str, count: int) -> Tuple[memoryview, int]:
+    end = position + array(typecode).itemsize * count
+    return view[position:end].cast(typecode), end + (-end % 8)
+
+
+class JsonlIndex:
+    """The index of one version of a JSONL file, see the module's docstring"""
+
+    def __init__(self, index: Any, data: Any):
+        view = memoryview(index)
+        _, _, _, self.size, self.mtime_ns, self.nr_records, nr_orders = _HEADER.unpack_from(view)
+        self._data = data
+        position = _HEADER.size + (-_HEADER.size % 8)
+        self._starts, position = _section(view, position, "Q", self.nr_records)
+        self._lengths, position = _section(view, position, "I", self.nr_records)
+        self._digests = view[position : position + _DIGEST_SIZE * self.nr_records]
+        position += _DIGEST_SIZE * self.nr_records
+        self._by_digest, position = _section(view, position, "I", self.nr_records)
+        self._orders: Dict[str, Tuple[memoryview, memoryview]] = {}
+        for _ in range(nr_orders):
+            name, count = _ORDER_HEADER.unpack_from(view, position)
+            sequence, position = _section(view, position + _ORDER_HEADER.size, "I", count)
+            rank, position = _section(view, position, "I", self.nr_records)
+            self._orders[name.rstrip(b"\0").decode()] = (sequence, rank)
+        # the ids excluded so far, the records with them, and, for each order, the position
+        # before which it lists only those records
+        self._excluded_ids: Set[str] = set()
+        self._excluded_records: Set[int] = set()
+        self._heads: Dict[str, int] = {}
+        # order -> (how many records were excluded, their positions in the order, sorted, as a set)
+        self._positions: Dict[str, Tuple[int, List[int], Set[int]]] = {}
+
+    def _digest(self, idx: int) -> bytes:
+        return bytes(self._digests[_DIGEST_SIZE * idx : _DIGEST_SIZE * (idx + 1)])
+
+    def record(self, idx: int) -> Dict[str, Any]:
+        start = self._starts[idx]
+        return json.loads(self._data[start : start + self._lengths[idx]])
+
+    def _with_digest(self, digest: bytes) -> List[int]:
+        # the records with that digest, in file order: a binary search over by_digest
+        low, high = 0, self.nr_records
+        while low < high:
+            middle = (low + high) // 2
+            if self._digest(self._by_digest[middle]) < digest:
+                low = middle + 1
+            else:
+                high = middle
+        found = []
+        while low < self.nr_records and self._digest(self._by_digest[low]) == digest:
+            found.append(self._by_digest[low])
+            low += 1
+        return found
+
+    def find(self, arquivo_url: str) -> Optional[Dict[str, Any]]:
+        """The first record in the file for `arquivo_url`, or None"""
+        for idx in self._with_digest(hashlib.sha256(arquivo_url.encode()).digest()):
+            record = self.record(idx)
+            if record.get("arquivo_url", "") == arquivo_url:
+                return record
+        return None
+
+    def _exclude(self, excluded: Set[str]) -> None:
+        # the ids to exclude, the annotated ones, are only ever added to: only the ones not
+        # seen before are looked up, unless some seen before are gone, when it starts over.
+        # Set operations run whole under the GIL, a commit adding to them meanwhile is safe.
+        if not self._excluded_ids <= excluded:
+            self._excluded_ids, self._excluded_records, self._heads, self._positions = set(), set(), {}, {}
+        new_ids = excluded - self._excluded_ids
+        for record_id in new_ids:
+            try:
+                digest = bytes.fromhex(record_id)
+            except ValueError:
+                continue
+            self._excluded_records.update(self._with_digest(digest))
+        self._excluded_ids |= new_ids
+
+    def _skipped(self, order: str, excluded: Set[str]) -> Tuple[List[int], Set[int]]:
+        # the positions of the excluded records in the order, sorted and as a set
+        self._exclude(excluded)
+        cached = self._positions.get(order)
+        if cached is not None and cached[0] == len(self._excluded_records):
+            return cached[1], cached[2]
+        _, rank = self._orders[order]
+        skipped = sorted(rank[idx] for idx in tuple(self._excluded_records) if rank[idx] != NOT_LISTED)
+        skipped_set = set(skipped)
+        self._positions[order] = (len(self._excluded_records), skipped, skipped_set)
+        return skipped, skipped_set
+
+    def listed(self, order: str, excluded: Optional[Set[str]] = None) -> Iterator[Tuple[str, int]]:
+        """(record id, record index) for the records `order` lists, in that order, leaving
+        out the records whose id is in `excluded`; the records are read with record().
+        Excluded records at the head of the order are only walked over once."""
+        sequence, _ = self._orders[order]
+        self._exclude(excluded or set())
+        # these, not the attributes: were they started over meanwhile, the head read here
+        # would not be the new one's
+        excluded_records, heads = self._excluded_records, self._heads
+        head = heads.get(order, 0)
+        for position in range(head, len(sequence)):
+            idx = sequence[position]
+            if idx in excluded_records:
+                if position == head:
+                    head = heads[order] = position + 1
+                continue
+            yield self._digest(idx).hex(), idx
+
+    def page(
+        self, order: str, offset: int = 0, limit: int = 20, excluded: Optional[Set[str]] = None
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """How many records `order` (one of ORDERS) lists, and `limit` of them from `offset`,
+        leaving out the records whose id is in `excluded`"""
+        sequence, _ = self._orders[order]
+        skipped, skipped_set = self._skipped(order, excluded or set())
+        # the position of the offset-th record that isn't skipped
+        position = offset
+        for skipped_position in skipped:
+            if skipped_position > position:
+                break
+            position += 1
+        records = []
+        while len(records) < limit and position < len(sequence):
+            if position not in skipped_set:
+                records.append(self.record(sequence[position]))
+            position += 1
+        return len(sequence) - len(skipped), records
+
+
+def _read_sidecar(sidecar: str, size: int, mtime_ns: int) -> Optional[Any]:
+    try:
+        index = _map(sidecar)
+    except OSError:
+        return None
+    if len(index) < _HEADER.size:
+        return None
+    magic, version, marker, indexed_size, indexed_mtime_ns, _, _ = _HEADER.unpack_from(index)
+    if (magic, version, marker, indexed_size, indexed_mtime_ns) != (_MAGIC, _VERSION, _MARKER, size, mtime_ns):
+        return None
+    return index
+
+
+# realpath -> the index of the file's version last seen
+_indexes: Dict[str, JsonlIndex] = {}
+
+
+def open_index(path: str) -> JsonlIndex:
+    """The index of the JSONL file at `path`, for its current size and mtime: the one in
+    use, the sidecar's, or a new one, built and written to the sidecar first"""
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    index = _indexes.get(path)
+    if index is not None and (index.size, index.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+        return index
+    sidecar = path + ".idx"
+    buffer = _read_sidecar(sidecar, stat.st_size, stat.st_mtime_ns)
+    if buffer is None:
+        buffer = _build(path, stat.st_size, stat.st_mtime_ns)
+        try:
+            with open(sidecar + ".tmp", "wb") as f_out:
+                f_out.write(buffer)
+            os.replace(sidecar + ".tmp", sidecar)
+        except OSError as error:
+            logger.warning(f"can't write {sidecar} ({error}), the index is kept in memory only")
+    # a previous version isn't unmapped here, a request may still be reading it; it goes
+    # away with the last reference to it
+    index = _indexes[path] = JsonlIndex(buffer, _map(path))
+    return index
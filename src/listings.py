@@ -0,0 +1,81 @@
+"""
+The personalities listings, /personalities/{page_nr} and /personalities/top/, sorted once
+per cache load instead of on every request: each combination of filter and sort order is
+a list kept in that order, a page is a slice of it, and the serialized bytes of the pages
+asked for are kept too.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+from cache import all_entities_info, on_load
+from responses import dumps
+
+PERSONALITIES_PER_PAGE = 32
+
+# (filter, sort) -> items, filter: "all", "portuguese" or "international", sort: "articles" or "name"
+_views: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+_top: List[Dict[str, Any]] = []
+
+
+def _is_portuguese(info: Dict[str, Any]) -> bool:
+    return any(c["wiki_id"] == "Q45" for c in info.get("countries", []))
+
+
+def _rebuild() -> None:
+    global _views, _top
+    listed = [
+        (wiki_id, info)
+        for wiki_id, info in all_entities_info.items()
+        if (info["nr_articles"] - info["nr_articles_by_type"].get("other", 0)) > 0
+    ]
+    items = {
+        wiki_id: {
+            "label": info["name"],
+            "nr_articles": info["nr_articles"] - info.get("nr_articles_by_type", {}).get("other", 0),
+            "local_image": info["image_url"],
+            "wiki_id": wiki_id,
+        }
+        for wiki_id, info in listed
+    }
+    portuguese = {wiki_id for wiki_id, info in listed if _is_portuguese(info)}
+    # all_entities_info is stored sorted by the *total* article count, not the relation-only
+    # one shown here, so "articles" is sorted explicitly; sorts are stable, ties keep the
+    # order of all_entities_info, as they did when each request sorted its own list
+    by_articles = sorted(items.values(), key=lambda p: p["nr_articles"], reverse=True)
+    by_name = sorted(items.values(), key=lambda p: p["label"])
+    views = {}
+    for sort, ordered in (("articles", by_articles), ("name", by_name)):
+        views[("all", sort)] = ordered
+        views[("portuguese", sort)] = [p for p in ordered if p["wiki_id"] in portuguese]
+        views[("international", sort)] = [p for p in ordered if p["wiki_id"] not in portuguese]
+
+    top = [
+        {"wiki_id": wiki_id, "name": info["name"], "image_url": info["image_url"], "nr_articles": info["nr_articles"]}
+        for wiki_id, info in listed
+        if wiki_id in portuguese
+    ]
+    _views, _top = views, sorted(top, key=lambda x: x["nr_articles"], reverse=True)
+    personalities_page.cache_clear()
+    top_personalities.cache_clear()
+
+
+@lru_cache(maxsize=256)
+def personalities_page(portuguese_only: bool, international_only: bool, sort: str, page_nr: int) -> bytes:
+    """/personalities/{page_nr}: {"total": ..., "items": [...]}, serialized"""
+    if portuguese_only and international_only:
+        personalities: List[Dict[str, Any]] = []
+    else:
+        selection = "portuguese" if portuguese_only else "international" if international_only else "all"
+        personalities = _views[(selection, "name" if sort == "name" else "articles")]
+    start_index = (page_nr - 1) * PERSONALITIES_PER_PAGE
+    end_index = start_index + PERSONALITIES_PER_PAGE
+    return dumps({"total": len(personalities), "items": personalities[start_index:end_index]})
+
+
+@lru_cache(maxsize=64)
+def top_personalities(n: int) -> bytes:
+    """/personalities/top/: the `n` Portuguese personalities with more articles, serialized"""
+    return dumps(_top[:n])
+
+
+on_load(_rebuild)
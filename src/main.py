@@ -1,44 +1,60 @@
+import dataclasses
 import json
 import logging
+import re
 import time
 from collections import defaultdict
-from typing import List, Union
+from typing import FrozenSet, Iterable, Iterator, List, Optional, Union
 
-from fastapi import FastAPI, Path, Query, Request, HTTPException
+from fastapi import FastAPI, Path, Query, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
 
 from annotation_router import router as annotation_router
+from article_search import available as article_search_available, search_articles
 from cache import all_entities_info, all_parties_info, persons, parties
+from compression import CompressionMiddleware
 from config import sparql_endpoint, start_year, end_year, NO_IMAGE, party_logo_url
+from facet_index import get_personalities_by_facet, search_persons
+from data_models import Person
 from sparql import (
     get_nr_of_persons,
+    get_person_history,
     get_person_info,
     get_person_relationships,
     get_person_relationships_by_year,
     get_person_relationships_for_year,
-    get_personalities_by_assembly,
-    get_personalities_by_education,
-    get_personalities_by_government,
-    get_personalities_by_occupation,
-    get_personalities_by_party,
-    get_personalities_by_public_office,
-    get_relationship_between_parties,
-    get_relationship_between_party_and_person,
-    get_relationship_between_person_and_party,
+    get_person_relationships_for_years,
+    get_person_relationships_normalized,
     get_relationship_between_two_persons,
     get_timeline_personalities,
-    get_top_relationships,
     get_total_articles_by_year_by_relationship_type,
     get_total_nr_of_articles,
-    get_wiki_id_affiliated_with_party,
 )
-from utils import get_info, get_chart_labels_min_max
+from relationship_index import (
+    get_relationship_between_parties,
+    get_relationship_between_party_and_person,
+    get_relationship_between_person_and_party,
+    get_relationships_aggregate_by_party,
+    get_top_relationships,
+)
+from listings import personalities_page, top_personalities
+from person_history import decode_cursor, encode_cursor
+from profile_store import get_profile
+from responses import CachedJSON, FastJSONResponse, ndjson_response
+from suggest_index import entity_index
+from utils import RELATIONSHIP_FIELDS, get_info, get_chart_labels_min_max, parse_fields, project
 
 rel_types = ["ent1_opposes_ent2", "ent1_supports_ent2", "ent2_opposes_ent1", "ent2_supports_ent1", "other"]
 
 wiki_id_regex = r"^Q\d+$"
 rel_type_regex = r"((" + "|".join(rel_types) + r"))"
+person_bucket_regex = (
+    r"^(all|sentiment|opposes|supports|opposed_by|supported_by|mutual_agreement|mutual_opposition|other|other_by)$"
+)
+
+# what ?fields= can select of /personality/{wiki_id}
+PERSON_FIELDS = [field.name for field in dataclasses.fields(Person)]
 
 topics = None
 topic_distr = None
@@ -47,7 +63,9 @@ url2index = None
 
 logger = logging.getLogger("uvicorn")
 
-app = FastAPI()
+# routes returning big payloads build a FastJSONResponse themselves, which skips FastAPI's
+# jsonable_encoder; the rest still go through it, but are then rendered with orjson too
+app = FastAPI(default_response_class=FastJSONResponse)
 app.include_router(annotation_router)
 
 # see: https://fastapi.tiangolo.com/tutorial/cors/
@@ -60,6 +78,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# only compresses what isn't already: CachedJSON responses come pre-compressed
+app.add_middleware(CompressionMiddleware)
 
 
 all_articles, n_other_articles = get_total_nr_of_articles()
@@ -82,10 +102,6 @@ def _nr_relation_articles(info: dict) -> int:
 DEFAULT_NETWORK_MIN_ARTICLES = 50
 
 
-def _has_sentiment_articles(wiki_id: str) -> bool:
-    return _nr_relation_articles(all_entities_info.get(wiki_id, {})) > 0
-
-
 def local_image(wiki_id: str, org_url: str, ent_type: str) -> str:
     base_url = "/assets/images/"
 
@@ -103,19 +119,44 @@ def local_image(wiki_id: str, org_url: str, ent_type: str) -> str:
     return f"{base_url}{wiki_id}.{org_url.split('.')[-1]}"
 
 
+def _fields(fields: Optional[str], valid: Iterable[str]) -> Optional[FrozenSet[str]]:
+    """the `fields=` projection parameter, or a 400 listing the valid names"""
+    try:
+        return parse_fields(fields, valid)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
+
+
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
 
 
 @app.get("/personality/{wiki_id}")
-async def personality(wiki_id: str = Path(regex=wiki_id_regex)):
-    person = get_person_info(wiki_id)
-    cached = all_entities_info.get(wiki_id, {})
-    person.image_url = cached.get("image_url") or local_image(person.wiki_id, person.image_url, ent_type="person")
-    for party in person.parties:
-        party.image_url = party_logo_url(party.wiki_id)
-
+async def personality(wiki_id: str = Path(regex=wiki_id_regex), fields: Optional[str] = Query(default=None)):
+    projection = _fields(fields, PERSON_FIELDS)
+    # from the profile store, images and logos included; only for persons missing from it
+    # is Wikidata queried, and then only for the requested Person fields
+    person = get_profile(wiki_id)
+    if person is None:
+        person = get_person_info(wiki_id, projection)
+        if projection is None or "image_url" in projection:
+            cached = all_entities_info.get(wiki_id, {})
+            person.image_url = cached.get("image_url") or local_image(
+                person.wiki_id, person.image_url, ent_type="person"
+            )
+        for party in person.parties or []:
+            party.image_url = party_logo_url(party.wiki_id)
+
+    if projection is None or "relationships_charts" in projection:
+        person.relationships_charts = _relationships_charts(wiki_id)
+
+    if projection is None:
+        return FastJSONResponse(person)
+    return FastJSONResponse({name: getattr(person, name) for name in PERSON_FIELDS if name in projection})
+
+
+def _relationships_charts(wiki_id: str) -> List[dict]:
     def year2index(input_year: int):
         return int(input_year) - start_year
 
@@ -134,23 +175,70 @@ async def personality(wiki_id: str = Path(regex=wiki_id_regex)):
             values[year2index(year)][k] += 1
 
     # this is a bit tricky, rels.update returns "None", but also updates rels which we want to add to the list
-    chart_data = [rels for idx, rels in enumerate(values) if not rels.update({"year": index2year(idx)})]
-    person.relationships_charts = chart_data
+    return [rels for idx, rels in enumerate(values) if not rels.update({"year": index2year(idx)})]
 
-    return person
+
+def _stream_person_relationships(wiki_id: str, fields: Optional[FrozenSet[str]] = None) -> Iterator[dict]:
+    """NDJSON lines: {"nodes": {...}} with the person and everyone related to them, then
+    every relationship, newest first; each carries its rel_type, i.e. its bucket."""
+    history = get_person_history(wiki_id)
+    nodes = {wiki_id: _node(wiki_id)}
+    for row in history.rows:
+        if row["ent2_id"] not in nodes:
+            nodes[row["ent2_id"]] = _node(row["ent2_id"])
+    yield {"nodes": nodes}
+    for row in reversed(history.rows):
+        yield row if fields is None else {key: value for key, value in row.items() if key in fields}
 
 
 @app.get("/personality/relationships/{wiki_id}")
-async def personality_relationships(wiki_id: str = Path(regex=wiki_id_regex)):
-    return get_person_relationships(wiki_id)
+async def personality_relationships(
+    wiki_id: str = Path(regex=wiki_id_regex),
+    response_format: str = Query(default="json", alias="format", regex="^(json|ndjson)$"),
+    layout: str = Query(default="buckets", regex="^(buckets|normalized)$"),
+    cursor: Optional[str] = Query(default=None),
+    page_size: Optional[int] = Query(default=None, ge=1, le=500),
+    bucket: Optional[str] = Query(default=None, regex=person_bucket_regex),
+    fields: Optional[str] = Query(default=None),
+):
+    projection = _fields(fields, RELATIONSHIP_FIELDS)
+    if response_format == "ndjson":
+        return ndjson_response(_stream_person_relationships(wiki_id, projection))
+    if cursor is not None or page_size is not None or bucket is not None:
+        # one page of one bucket, newest first, continued with the returned next_cursor
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error)) from error
+        rows, next_key = get_person_history(wiki_id).page(bucket or "all", after, page_size or 50)
+        next_cursor = encode_cursor(next_key) if next_key else None
+        return FastJSONResponse({"articles": project(rows, projection), "next_cursor": next_cursor})
+    if layout == "normalized":
+        normalized = get_person_relationships_normalized(wiki_id)
+        return FastJSONResponse({**normalized, "articles": project(normalized["articles"], projection)})
+    buckets = get_person_relationships(wiki_id)
+    return FastJSONResponse({bucket: project(rows, projection) for bucket, rows in buckets.items()})
 
 
 @app.get("/personality/relationships/{wiki_id}/{year}")
 async def personality_relationships_for_year(
     wiki_id: str = Path(regex=wiki_id_regex),
     year: str = Path(regex=r"^\d{4}$"),
+    fields: Optional[str] = Query(default=None),
+):
+    projection = _fields(fields, RELATIONSHIP_FIELDS)
+    return FastJSONResponse(project(get_person_relationships_for_year(wiki_id, year), projection))
+
+
+@app.get("/personality/relationships/{wiki_id}/{start}/{end}")
+async def personality_relationships_for_years(
+    wiki_id: str = Path(regex=wiki_id_regex),
+    start: str = Path(regex=r"^\d{4}$"),
+    end: str = Path(regex=r"^\d{4}$"),
+    fields: Optional[str] = Query(default=None),
 ):
-    return get_person_relationships_for_year(wiki_id, year)
+    projection = _fields(fields, RELATIONSHIP_FIELDS)
+    return FastJSONResponse(project(get_person_relationships_for_years(wiki_id, start, end), projection))
 
 
 @app.get("/personality/relationships_by_year/{wiki_id}")
@@ -161,9 +249,28 @@ async def personality_relationships_by_year(wiki_id: str = Path(regex=wiki_id_re
     return results
 
 
+@app.get("/personality/relationships_by_party/{wiki_id}")
+async def personality_relationships_by_party(wiki_id: str = Path(regex=wiki_id_regex)):
+    return FastJSONResponse(get_relationships_aggregate_by_party(wiki_id))
+
+
 @app.get("/personality/top_related_personalities/{wiki_id}")
-async def personality_top_related_personalities(wiki_id: str = Path(regex=wiki_id_regex)):
-    return get_top_relationships(wiki_id)
+async def personality_top_related_personalities(
+    wiki_id: str = Path(regex=wiki_id_regex),
+    k: Optional[int] = Query(default=None, ge=1),
+):
+    top_related = get_top_relationships(wiki_id)
+    if k is None:
+        return FastJSONResponse(top_related)
+    return FastJSONResponse({key: values[:k] for key, values in top_related.items()})
+
+
+def _stream_relationships(
+    ent_1: str, ent_2: str, rel_type: str, start: str, end: str, fields: Optional[FrozenSet[str]] = None
+) -> Iterator[dict]:
+    """NDJSON lines: {"nodes": {...}} with the two persons, then one line per article"""
+    yield {"nodes": {ent_1: _node(ent_1), ent_2: _node(ent_2)}}
+    yield from get_relationship_between_two_persons(ent_1, ent_2, rel_type, start, end, fields)
 
 
 @app.get("/relationships/{ent_1}/{rel_type}/{ent_2}/{start}/{end}")
@@ -173,24 +280,29 @@ async def relationships(
     ent_2: str = Path(regex=wiki_id_regex),
     start: str = Path(),
     end: str = Path(),
+    response_format: str = Query(default="json", alias="format", regex="^(json|ndjson)$"),
+    fields: Optional[str] = Query(default=None),
 ):
-    return get_relationship_between_two_persons(ent_1, ent_2, rel_type, start, end)
+    projection = _fields(fields, RELATIONSHIP_FIELDS)
+    if response_format == "ndjson":
+        return ndjson_response(_stream_relationships(ent_1, ent_2, rel_type, start, end, projection))
+    return FastJSONResponse(get_relationship_between_two_persons(ent_1, ent_2, rel_type, start, end, projection))
+
+
+# served as bytes serialized once per dataset version, see responses.CachedJSON
+_parties_response = CachedJSON(lambda: all_parties_info)
+_persons_response = CachedJSON(lambda: persons)
+_persons_and_parties_response = CachedJSON(lambda: sorted(persons + parties, key=lambda x: x["label"]))
 
 
 @app.get("/parties/")
-async def get_all_parties():
-    return list(all_parties_info)
+async def get_all_parties(request: Request):
+    return _parties_response.response(request)
 
 
 @app.get("/personalities/top/")
 async def get_top_personalities(n: int = 50):
-    portuguese = [
-        {"wiki_id": k, "name": v["name"], "image_url": v["image_url"], "nr_articles": v["nr_articles"]}
-        for k, v in all_entities_info.items()
-        if any(c["wiki_id"] == "Q45" for c in v.get("countries", []))
-        and (v["nr_articles"] - v["nr_articles_by_type"].get("other", 0)) > 0
-    ]
-    return sorted(portuguese, key=lambda x: x["nr_articles"], reverse=True)[:n]
+    return Response(content=top_personalities(n), media_type="application/json")
 
 
 @app.get("/personalities/{page_nr}")
@@ -200,36 +312,30 @@ async def get_personalities(
     international_only: bool = False,
     sort: str = "articles",
 ):
-    personalities_per_page = 32
-    personalities = [
-        {"label": v["name"], "nr_articles": _nr_relation_articles(v), "local_image": v["image_url"], "wiki_id": k}
-        for k, v in all_entities_info.items()
-        if (v["nr_articles"] - v["nr_articles_by_type"].get("other", 0)) > 0
-        and (not portuguese_only or any(c["wiki_id"] == "Q45" for c in v.get("countries", [])))
-        and (not international_only or not any(c["wiki_id"] == "Q45" for c in v.get("countries", [])))
-    ]
-    # all_entities_info is stored sorted by the *total* article count (cache-build
-    # time, generate_caches.py), not the relation-only one used here since #14 — for
-    # "articles" that drifted apart from what's actually displayed, so it's sorted
-    # explicitly rather than trusted from dict order. "name" needs its own sort in
-    # any case: nothing about this list is ever alphabetical otherwise.
-    if sort == "name":
-        personalities.sort(key=lambda p: p["label"])
-    else:
-        personalities.sort(key=lambda p: p["nr_articles"], reverse=True)
-    start_index = (page_nr - 1) * personalities_per_page
-    end_index = start_index + personalities_per_page
-    return {"total": len(personalities), "items": personalities[start_index:end_index]}
+    # presorted once per cache load, and the bytes of each page kept, see listings.py
+    page = personalities_page(portuguese_only, international_only, sort, page_nr)
+    return Response(content=page, media_type="application/json")
 
 
 @app.get("/persons/")
-async def get_all_persons():
-    return persons
+async def get_all_persons(request: Request):
+    return _persons_response.response(request)
 
 
 @app.get("/persons_and_parties/")
-async def persons_and_parties():
-    return sorted(persons + parties, key=lambda x: x["label"])
+async def persons_and_parties(request: Request):
+    return _persons_and_parties_response.response(request)
+
+
+@app.get("/suggest")
+async def suggest(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(default=10, ge=1, le=50),
+    entity_type: Optional[str] = Query(default=None, alias="type", regex="^(person|party)$"),
+):
+    """Autocomplete over persons and parties, accents and case ignored: names with a word
+    starting with `q` first, then names containing it, each by popularity."""
+    return FastJSONResponse(entity_index.suggest(q, limit, entity_type))
 
 
 def _build_timeline(wiki_ids: List[str], selected: bool, sentiment: bool, min_freq: int, start: str, end: str) -> dict:
@@ -313,7 +419,26 @@ async def timeline(
     end: str = Query()
 
 ):
-    return _build_timeline(q, selected, sentiment, min_freq, start, end)
+    return FastJSONResponse(_build_timeline(q, selected, sentiment, min_freq, start, end))
+
+
+def _node(wiki_id: str) -> dict:
+    info = all_entities_info.get(wiki_id, {})
+    return {"name": info.get("name"), "image_url": info.get("image_url")}
+
+
+def _raw_relationship(x: dict) -> dict:
+    rel_type = x["rel_type"]
+    if rel_type in ("ent1_opposes_ent2", "ent1_supports_ent2"):
+        actor, target = x["ent1_id"], x["ent2_id"]
+    else:  # ent2_opposes_ent1, ent2_supports_ent1
+        actor, target = x["ent2_id"], x["ent1_id"]
+    return {
+        "from": actor,
+        "to": target,
+        "sign": "opõe-se" if "opposes" in rel_type else "apoia",
+        "year": int(x["date"][:4]),
+    }
 
 
 def _build_raw_relationships(wiki_ids: List[str], selected: bool, sentiment: bool, start: str, end: str) -> dict:
@@ -329,31 +454,53 @@ def _build_raw_relationships(wiki_ids: List[str], selected: bool, sentiment: boo
     up in many relationships."""
     results = get_timeline_personalities(wiki_ids, selected, sentiment, start, end)
 
-    relationships = []
+    relationships = [_raw_relationship(x) for x in results]
     nodes = {}
+    for relationship in relationships:
+        for wiki_id in (relationship["from"], relationship["to"]):
+            if wiki_id not in nodes:
+                nodes[wiki_id] = _node(wiki_id)
+
+    print(f"raw relationships: {len(relationships)}, nodes: {len(nodes)}")
+    return {"relationships": relationships, "nodes": nodes}
 
-    def add_node(wiki_id):
-        if wiki_id not in nodes:
-            info = all_entities_info.get(wiki_id, {})
-            nodes[wiki_id] = {"name": info.get("name"), "image_url": info.get("image_url")}
 
+def _stream_raw_relationships(
+    wiki_ids: List[str], selected: bool, sentiment: bool, start: str, end: str
+) -> Iterator[dict]:
+    """`_build_raw_relationships` as NDJSON lines: {"nodes": {...}} first, then one line
+    per relationship, built as they are sent rather than collected into a list."""
+    results = get_timeline_personalities(wiki_ids, selected, sentiment, start, end)
+    nodes = {}
     for x in results:
-        rel_type = x["rel_type"]
-        if rel_type in ("ent1_opposes_ent2", "ent1_supports_ent2"):
-            actor, target = x["ent1_id"], x["ent2_id"]
-        else:  # ent2_opposes_ent1, ent2_supports_ent1
-            actor, target = x["ent2_id"], x["ent1_id"]
-        add_node(actor)
-        add_node(target)
-        relationships.append({
-            "from": actor,
-            "to": target,
-            "sign": "opõe-se" if "opposes" in rel_type else "apoia",
-            "year": int(x["date"][:4]),
-        })
+        for wiki_id in (x["ent1_id"], x["ent2_id"]):
+            if wiki_id not in nodes:
+                nodes[wiki_id] = _node(wiki_id)
+    yield {"nodes": nodes}
+    for x in results:
+        yield _raw_relationship(x)
 
-    print(f"raw relationships: {len(relationships)}, nodes: {len(nodes)}")
-    return {"relationships": relationships, "nodes": nodes}
+
+RAW_SIGNS = ["opõe-se", "apoia"]
+
+
+def _columnar_relationships(raw: dict) -> dict:
+    """`_build_raw_relationships`' output as parallel arrays: relationship i goes from
+    nodes[from[i]] to nodes[to[i]], with sign signs[sign[i]], in year[i]. Tens of thousands
+    of rows no longer repeat the "from"/"to"/"sign"/"year" keys nor the wiki_ids, which
+    is most of the row layout's size, and most of what the browser has to parse."""
+    node_ids = list(raw["nodes"])
+    node_index = {wiki_id: idx for idx, wiki_id in enumerate(node_ids)}
+    sign_index = {sign: idx for idx, sign in enumerate(RAW_SIGNS)}
+    relationships = raw["relationships"]
+    return {
+        "nodes": [{"id": wiki_id, **raw["nodes"][wiki_id]} for wiki_id in node_ids],
+        "signs": RAW_SIGNS,
+        "from": [node_index[r["from"]] for r in relationships],
+        "to": [node_index[r["to"]] for r in relationships],
+        "sign": [sign_index[r["sign"]] for r in relationships],
+        "year": [r["year"] for r in relationships],
+    }
 
 
 @app.get("/timeline/raw")
@@ -363,16 +510,25 @@ async def timeline_raw(
     sentiment: bool = Query(),
     start: str = Query(),
     end: str = Query(),
+    response_format: str = Query(default="json", alias="format", regex="^(json|ndjson)$"),
+    layout: str = Query(default="rows", regex="^(rows|columnar)$"),
 ):
-    return _build_raw_relationships(q, selected, sentiment, start, end)
+    if response_format == "ndjson":
+        return ndjson_response(_stream_raw_relationships(q, selected, sentiment, start, end))
+    raw = _build_raw_relationships(q, selected, sentiment, start, end)
+    if layout == "columnar":
+        return FastJSONResponse(_columnar_relationships(raw))
+    return FastJSONResponse(raw)
 
 
 @app.get("/timeline/default")
-async def timeline_default():
+async def timeline_default(request: Request, layout: str = Query(default="rows", regex="^(rows|columnar)$")):
     """Explorar's default view, precomputed at startup (see `_default_network_raw`
     below) — the SPARQL query behind it takes several seconds even for a single
     request; run once per process instead of once per page load."""
-    return _default_network_raw
+    if layout == "columnar":
+        return _default_network_columnar_response.response(request)
+    return _default_network_response.response(request)
 
 
 _default_network_seeds = [
@@ -389,6 +545,24 @@ logger.info(
     f"Default network cache ready in {time.time() - _default_network_cache_start:.1f}s: "
     f"{len(_default_network_raw['relationships'])} relationships, {len(_default_network_raw['nodes'])} nodes"
 )
+_default_network_response = CachedJSON(lambda: _default_network_raw)
+_default_network_columnar_response = CachedJSON(lambda: _columnar_relationships(_default_network_raw))
+
+
+@app.get("/search")
+async def search(
+    q: str = Query(..., min_length=2),
+    person: Optional[str] = Query(default=None, regex=wiki_id_regex),
+    rel_type: Optional[str] = Query(default=None, regex=r"^(" + "|".join(rel_types) + r"|all_sentiment)$"),
+    start: Optional[str] = Query(default=None, regex=r"^\d{4}$"),
+    end: Optional[str] = Query(default=None, regex=r"^\d{4}$"),
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    """Articles whose title or paragraph match `q`, best first, optionally only those
+    reporting a relationship of/with `person`, of `rel_type`, between `start` and `end`."""
+    if not article_search_available():
+        raise HTTPException(status_code=503, detail="the search index hasn't been built, see generate_caches.py")
+    return FastJSONResponse(search_articles(q, person, rel_type, start, end, limit))
 
 
 @app.get("/queries")
@@ -398,7 +572,9 @@ async def queries(
     rel_type: str = Query(),
     start: str = Query(),
     end: str = Query(),
+    fields: Optional[str] = Query(default=None),
 ):
+    projection = _fields(fields, RELATIONSHIP_FIELDS)
     # time interval for the query
     year_from = start
     year_to = end
@@ -406,86 +582,82 @@ async def queries(
     e2_type = get_info(ent2)
 
     if e1_type == "person" and e2_type == "person":
-        return get_relationship_between_two_persons(ent1, ent2, rel_type, year_from, year_to)
+        return FastJSONResponse(
+            get_relationship_between_two_persons(ent1, ent2, rel_type, year_from, year_to, projection)
+        )
 
     if e1_type == "party" and e2_type == "person":
-        return get_relationship_between_party_and_person(ent1, ent2, rel_type, year_from, year_to)
+        results = get_relationship_between_party_and_person(ent1, ent2, rel_type, year_from, year_to)
+        return FastJSONResponse(project(results, projection))
 
     if e1_type == "person" and e2_type == "party":
-        return get_relationship_between_person_and_party(ent1, ent2, rel_type, year_from, year_to)
+        results = get_relationship_between_person_and_party(ent1, ent2, rel_type, year_from, year_to)
+        return FastJSONResponse(project(results, projection))
 
     if e1_type == "party" and e2_type == "party":
-        # get the members for each party
-        party_a = " ".join(["wd:" + x for x in get_wiki_id_affiliated_with_party(ent1)])
-        party_b = " ".join(["wd:" + x for x in get_wiki_id_affiliated_with_party(ent2)])
-        r = get_relationship_between_parties(party_a, party_b, rel_type, year_from, year_to)
-        return r
+        results = get_relationship_between_parties(ent1, ent2, rel_type, year_from, year_to)
+        return FastJSONResponse(project(results, projection))
 
 
 @app.get("/personalities/educated_at/{wiki_id}")
 async def personalities_educated_at(wiki_id: str = Path(regex=wiki_id_regex)):
-    results = get_personalities_by_education(wiki_id)
-    for r in results:
-        entry_wiki_id = r["ent1"]["value"].split("/")[-1]
-        info = all_entities_info.get(entry_wiki_id, {})
-        r["image_url"]["value"] = info.get("image_url", NO_IMAGE)
-        r["nr_articles"] = _nr_relation_articles(info)
-    return [r for r in results if _has_sentiment_articles(r["ent1"]["value"].split("/")[-1])]
+    return FastJSONResponse(get_personalities_by_facet("education", wiki_id))
 
 
 @app.get("/personalities/occupation/{wiki_id}")
 async def personalities_occupation(wiki_id: str = Path(regex=wiki_id_regex)):
-    results = get_personalities_by_occupation(wiki_id)
-    for r in results:
-        entry_wiki_id = r["ent1"]["value"].split("/")[-1]
-        info = all_entities_info.get(entry_wiki_id, {})
-        r["image_url"]["value"] = info.get("image_url", NO_IMAGE)
-        r["nr_articles"] = _nr_relation_articles(info)
-    return [r for r in results if _has_sentiment_articles(r["ent1"]["value"].split("/")[-1])]
+    return FastJSONResponse(get_personalities_by_facet("occupation", wiki_id))
 
 
 @app.get("/personalities/public_office/{wiki_id}")
 async def personalities_public_office(wiki_id: str = Path(regex=wiki_id_regex)):
-    results = get_personalities_by_public_office(wiki_id)
-    for r in results:
-        entry_wiki_id = r["ent1"]["value"].split("/")[-1]
-        info = all_entities_info.get(entry_wiki_id, {})
-        r["image_url"]["value"] = info.get("image_url", NO_IMAGE)
-        r["nr_articles"] = _nr_relation_articles(info)
-    return [r for r in results if _has_sentiment_articles(r["ent1"]["value"].split("/")[-1])]
+    return FastJSONResponse(get_personalities_by_facet("public_office", wiki_id))
 
 
 @app.get("/personalities/government/{wiki_id}")
 async def read_item(wiki_id: str = Path(regex=wiki_id_regex)):
-    results = get_personalities_by_government(wiki_id)
-    for r in results:
-        entry_wiki_id = r["ent1"]["value"].split("/")[-1]
-        info = all_entities_info.get(entry_wiki_id, {})
-        r["image_url"]["value"] = info.get("image_url", NO_IMAGE)
-        r["nr_articles"] = _nr_relation_articles(info)
-    return [r for r in results if _has_sentiment_articles(r["ent1"]["value"].split("/")[-1])]
+    return FastJSONResponse(get_personalities_by_facet("government", wiki_id))
 
 
 @app.get("/personalities/assembly/{wiki_id}")
 async def personalities_assembly(wiki_id: str = Path(regex=wiki_id_regex)):
-    results = get_personalities_by_assembly(wiki_id)
-    for r in results:
-        entry_wiki_id = r["ent1"]["value"].split("/")[-1]
-        info = all_entities_info.get(entry_wiki_id, {})
-        r["image_url"]["value"] = info.get("image_url", NO_IMAGE)
-        r["nr_articles"] = _nr_relation_articles(info)
-    return [r for r in results if _has_sentiment_articles(r["ent1"]["value"].split("/")[-1])]
+    return FastJSONResponse(get_personalities_by_facet("assembly", wiki_id))
 
 
 @app.get("/personalities/party/{wiki_id}")
 async def personalities_party(wiki_id: str = Path(regex=wiki_id_regex)):
-    results = get_personalities_by_party(wiki_id)
-    for r in results:
-        entry_wiki_id = r["ent1"]["value"].split("/")[-1]
-        info = all_entities_info.get(entry_wiki_id, {})
-        r["image_url"]["value"] = info.get("image_url", NO_IMAGE)
-        r["nr_articles"] = _nr_relation_articles(info)
-    return [r for r in results if _has_sentiment_articles(r["ent1"]["value"].split("/")[-1])]
+    return FastJSONResponse(get_personalities_by_facet("party", wiki_id))
+
+
+@app.get("/facets")
+async def facets_search(
+    party: List[str] = Query(default=[]),
+    occupation: List[str] = Query(default=[]),
+    education: List[str] = Query(default=[]),
+    public_office: List[str] = Query(default=[]),
+    government: List[str] = Query(default=[]),
+    assembly: List[str] = Query(default=[]),
+    match: str = Query(default="any", regex="^(any|all)$"),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=32, ge=1, le=100),
+):
+    """Persons combining several facets, e.g.: members of a party educated at a given
+    university who held a given office. Facets are combined with AND; the values given for
+    one facet with OR, or AND with match=all. Also returns the counts of each facet's
+    values among the persons found."""
+    filters = {
+        "party": party,
+        "occupation": occupation,
+        "education": education,
+        "public_office": public_office,
+        "government": government,
+        "assembly": assembly,
+    }
+    for values in filters.values():
+        if any(not re.match(wiki_id_regex, value) for value in values):
+            raise HTTPException(status_code=400, detail=f"invalid wiki_id in {values}")
+    selected = {facet: values for facet, values in filters.items() if values}
+    return FastJSONResponse(search_persons(selected, match == "all", offset, limit))
 
 
 @app.get("/stats")
@@ -0,0 +1,81 @@
+import base64
+import json
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+SENTIMENT_TYPES = {"opposes", "supports"}
+
+# a row's position in the history: (date, arquivo_doc, ent2_id), the last two only break ties
+Key = Tuple[str, str, str]
+
+
+def _key(row: Dict[str, Any]) -> Key:
+    return row["date"], row["arquivo_doc"], row.get("ent2_id", "")
+
+
+def encode_cursor(key: Key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Key:
+    """raises ValueError if `cursor` wasn't made by encode_cursor()"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (UnicodeError, ValueError) as error:
+        raise ValueError(f"invalid cursor: {cursor}") from error
+    if not isinstance(key, list) or len(key) != 3 or not all(isinstance(part, str) for part in key):
+        raise ValueError(f"invalid cursor: {cursor}")
+    return key[0], key[1], key[2]
+
+
+class PersonHistory:
+    """All the relationship rows of one person, sorted by date, with the offsets where
+    each year starts and ends, so a year, or a range of years, is a slice of the rows
+    rather than another query."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = sorted(rows, key=_key)
+        self.dates = [row["date"] for row in self.rows]
+        self.keys = [_key(row) for row in self.rows]
+        self.year_offsets: Dict[int, Tuple[int, int]] = {}
+        for idx, date in enumerate(self.dates):
+            year = int(date[:4])
+            start, _ = self.year_offsets.get(year, (idx, idx))
+            self.year_offsets[year] = (start, idx + 1)
+        self._buckets: Dict[str, List[int]] = {}
+
+    def for_year(self, year: int) -> List[Dict[str, Any]]:
+        start, end = self.year_offsets.get(year, (0, 0))
+        return self.rows[start:end]
+
+    def for_years(self, start_year: int, end_year: int) -> List[Dict[str, Any]]:
+        start = bisect_left(self.dates, f"{start_year:04d}")
+        end = bisect_left(self.dates, f"{end_year + 1:04d}")
+        return self.rows[start:end]
+
+    def _bucket(self, bucket: str) -> List[int]:
+        """positions of the rows in `bucket`, a rel_type, 'sentiment' or 'all', ascending"""
+        positions = self._buckets.get(bucket)
+        if positions is None:
+            if bucket == "all":
+                positions = list(range(len(self.rows)))
+            elif bucket == "sentiment":
+                positions = [idx for idx, row in enumerate(self.rows) if row["rel_type"] in SENTIMENT_TYPES]
+            else:
+                positions = [idx for idx, row in enumerate(self.rows) if row["rel_type"] == bucket]
+            self._buckets[bucket] = positions
+        return positions
+
+    def page(
+        self, bucket: str = "all", after: Optional[Key] = None, size: int = 50
+    ) -> Tuple[List[Dict[str, Any]], Optional[Key]]:
+        """Up to `size` rows of `bucket`, newest first, starting right after the row whose
+        key is `after`, or from the newest one; plus the key to continue from, None on the
+        last page. Keys don't shift when rows are added, unlike offsets."""
+        positions = self._bucket(bucket)
+        end = len(positions)
+        if after is not None:
+            end = bisect_left(positions, bisect_left(self.keys, after))
+        start = max(end - size, 0)
+        rows = [self.rows[idx] for idx in reversed(positions[start:end])]
+        return rows, self.keys[positions[start]] if start > 0 else None
@@ -0,0 +1,61 @@
+"""
+The persons' Wikidata profiles, as generate_caches.py stores them: `profiles.jsonl`, one
+JSON line per person, and `profiles_index.json`, the offset and length of each line.
+Only the index is kept in memory; a profile is a single positioned read of its line.
+
+Both files are optional, /personality/{wiki_id} falls back to querying Wikidata for a
+person that isn't in the store, or when there's no store at all.
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from cache import on_load
+from config import STATIC_DATA
+from data_models import Element, Person, PoliticalParty
+
+PROFILES_FILE = "profiles.jsonl"
+INDEX_FILE = "profiles_index.json"
+
+logger = logging.getLogger("uvicorn")
+
+_store: Dict[str, Any] = {"file": None, "index": {}}
+
+
+def _reopen() -> None:
+    # the previous file isn't closed here, a request may still be reading from it; it is
+    # closed when the last reference to it goes away
+    if not os.path.exists(STATIC_DATA + PROFILES_FILE) or not os.path.exists(STATIC_DATA + INDEX_FILE):
+        logger.warning(f"no {PROFILES_FILE} in {STATIC_DATA}, persons' profiles will be queried from Wikidata")
+        _store["file"], _store["index"] = None, {}
+        return
+    with open(STATIC_DATA + INDEX_FILE, encoding="utf8") as f_in:
+        index = json.load(f_in)
+    profiles = open(STATIC_DATA + PROFILES_FILE, "rb")  # pylint: disable=consider-using-with
+    _store["file"], _store["index"] = profiles, index
+
+
+def get_profile(wiki_id: str) -> Optional[Person]:
+    """The person's stored profile, relationships_charts left out, or None if not stored"""
+    f_in, index = _store["file"], _store["index"]
+    entry: Optional[List[int]] = index.get(wiki_id)
+    if f_in is None or entry is None:
+        return None
+    offset, length = entry
+    # pread: no shared file position, concurrent requests can't move each other's reads
+    profile = json.loads(os.pread(f_in.fileno(), length, offset))
+    return Person(
+        wiki_id=wiki_id,
+        name=profile["name"],
+        image_url=profile["image_url"],
+        parties=[PoliticalParty(**party) for party in profile["parties"]],
+        positions=[Element(**element) for element in profile["positions"]],
+        education=[Element(**element) for element in profile["education"]],
+        occupations=[Element(**element) for element in profile["occupations"]],
+        governments=[Element(**element) for element in profile["governments"]],
+        assemblies=[Element(**element) for element in profile["assemblies"]],
+    )
+
+
+on_load(_reopen)
@@ -0,0 +1,253 @@
+"""
+In-memory index over `relationships.json` (see generate_caches.py), for the queries that
+aggregate over groups of persons, e.g.: all the members of a party.
+
+Those used to be answered by asking Wikidata for the members of each party and sending
+them back to the SPARQL endpoint as `VALUES` blocks of hundreds of wiki_ids. Here every
+wiki_id is interned to an int, each entity keeps the row numbers of its relationships,
+and a group is a membership vector over the interned ids, so matching one side of a row
+against a whole party is a single array lookup.
+"""
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from cache import all_entities_info, all_parties_info, member_parties, on_load, party_members, relationships
+from config import NO_IMAGE
+from utils import invert_relationship, rel_type_matches
+
+
+class RelationshipIndex:
+    def __init__(self, rows: List[Dict[str, str]]):
+        self.rows = rows
+        self.entity_ids: Dict[str, int] = {}
+        self.wiki_ids: List[str] = []
+        self.ent1 = array("i")
+        self.ent2 = array("i")
+        self.years = array("h")
+        self.postings: List[array] = []
+        for row_nr, row in enumerate(rows):
+            ent1 = self._intern(row["ent1_id"])
+            ent2 = self._intern(row["ent2_id"])
+            self.ent1.append(ent1)
+            self.ent2.append(ent2)
+            self.years.append(int(row["date"][:4]))
+            self.postings[ent1].append(row_nr)
+            if ent2 != ent1:
+                self.postings[ent2].append(row_nr)
+
+    def _intern(self, wiki_id: str) -> int:
+        idx = self.entity_ids.get(wiki_id)
+        if idx is None:
+            idx = len(self.entity_ids)
+            self.entity_ids[wiki_id] = idx
+            self.wiki_ids.append(wiki_id)
+            self.postings.append(array("i"))
+        return idx
+
+    def membership(self, wiki_ids: Iterable[str]) -> bytearray:
+        """a vector over the interned ids with 1 for each of `wiki_ids`"""
+        mask = bytearray(len(self.entity_ids))
+        for wiki_id in wiki_ids:
+            idx = self.entity_ids.get(wiki_id)
+            if idx is not None:
+                mask[idx] = 1
+        return mask
+
+    def rows_between(self, group_a: Iterable[str], group_b: Iterable[str]) -> Iterator[Tuple[int, bool]]:
+        """Yields (row_nr, a_is_ent1) for each relationship with one entity in `group_a`
+        and the other in `group_b`, each row at most once."""
+        mask_b = self.membership(group_b)
+        seen = set()
+        for wiki_id in group_a:
+            a = self.entity_ids.get(wiki_id)
+            if a is None:
+                continue
+            for row_nr in self.postings[a]:
+                if row_nr in seen:
+                    continue
+                if self.ent1[row_nr] == a and mask_b[self.ent2[row_nr]]:
+                    seen.add(row_nr)
+                    yield row_nr, True
+                elif self.ent2[row_nr] == a and mask_b[self.ent1[row_nr]]:
+                    seen.add(row_nr)
+                    yield row_nr, False
+
+
+_index = RelationshipIndex([])
+_parties_info: Dict[str, Dict[str, Any]] = {}
+
+# sparse actor x target count matrices, one per sign, stored as rows (actor -> {target: freq})
+# and as columns (target -> {actor: freq}); a person's top related personalities are then
+# reductions over one row or one column instead of two SPARQL queries and four tallies
+_matrices: Dict[str, Dict[int, Counter]] = {}
+
+
+def _oriented_row(row: Dict[str, str], a_is_ent1: bool) -> Dict[str, str]:
+    """The row as seen from group A: ent1 is always the entity in A, and rel_type (and the
+    _str fields) are swapped accordingly when A is the triple's ent2."""
+    if a_is_ent1:
+        ent1_id, ent1_str, ent2_id, ent2_str = row["ent1_id"], row["ent1_str"], row["ent2_id"], row["ent2_str"]
+        rel_type = row["rel_type"]
+    else:
+        ent1_id, ent1_str, ent2_id, ent2_str = row["ent2_id"], row["ent2_str"], row["ent1_id"], row["ent1_str"]
+        rel_type = invert_relationship(row["rel_type"]) if row["rel_type"].startswith("ent") else row["rel_type"]
+    return {
+        "arquivo_doc": row["arquivo_doc"],
+        "date": row["date"],
+        "title": row["title"],
+        "domain": row["domain"],
+        "original_url": row["original_url"],
+        "paragraph": row["paragraph"],
+        "rel_type": rel_type,
+        "ent1_id": ent1_id,
+        "ent1_str": ent1_str,
+        "ent2_id": ent2_id,
+        "ent2_str": ent2_str,
+        "ent1_img": all_entities_info.get(ent1_id, {}).get("image_url", NO_IMAGE),
+        "ent2_img": all_entities_info.get(ent2_id, {}).get("image_url", NO_IMAGE),
+    }
+
+
+def get_relationship_between_groups(
+    group_a: Iterable[str], group_b: Iterable[str], rel_type: str, start_year: str, end_year: str
+) -> List[Dict[str, str]]:
+    """Relationships between any entity in `group_a` and any in `group_b`, newest first.
+    `rel_type` is read from A's perspective, i.e.: 'ent1_opposes_ent2' is someone in A
+    opposing someone in B, whichever way round the triple was stored."""
+    year_from, year_to = int(start_year), int(end_year)
+    results = []
+    for row_nr, a_is_ent1 in _index.rows_between(group_a, group_b):
+        if not year_from <= _index.years[row_nr] <= year_to:
+            continue
+        row = _oriented_row(_index.rows[row_nr], a_is_ent1)
+        if rel_type_matches(rel_type, row["rel_type"]):
+            results.append(row)
+    return sorted(results, key=lambda x: x["date"], reverse=True)
+
+
+@lru_cache(maxsize=50)
+def get_relationship_between_parties(party_a, party_b, rel_type, start_year, end_year):
+    return get_relationship_between_groups(
+        party_members.get(party_a, []), party_members.get(party_b, []), rel_type, start_year, end_year
+    )
+
+
+@lru_cache(maxsize=50)
+def get_relationship_between_party_and_person(party, person, rel_type, start_year, end_year):
+    return get_relationship_between_groups(party_members.get(party, []), [person], rel_type, start_year, end_year)
+
+
+@lru_cache(maxsize=50)
+def get_relationship_between_person_and_party(person, party, rel_type, start_year, end_year):
+    return get_relationship_between_groups([person], party_members.get(party, []), rel_type, start_year, end_year)
+
+
+@lru_cache(maxsize=256)
+def get_relationships_aggregate_by_party(wiki_id: str) -> List[Dict[str, Any]]:
+    """Which parties a person relates with more, through support and opposition: how many
+    times, per year, the person opposed/supported a member of each party. Parties the
+    person never targeted are left out, the others come sorted by total count."""
+    person = _index.entity_ids.get(wiki_id)
+    if person is None:
+        return []
+
+    # count per (target, year, sign) first, a party gets the counts of all its members
+    by_target: Counter = Counter()
+    for row_nr in _index.postings[person]:
+        rel_type = _index.rows[row_nr]["rel_type"]
+        if _index.ent1[row_nr] == person:
+            target, prefix = _index.ent2[row_nr], "ent1_"
+        else:
+            target, prefix = _index.ent1[row_nr], "ent2_"
+        if target == person or not rel_type.startswith(prefix):
+            continue
+        sign = "opposes" if "opposes" in rel_type else "supports" if "supports" in rel_type else None
+        if sign:
+            by_target[(target, _index.years[row_nr], sign)] += 1
+
+    by_party: Dict[str, Dict[int, Dict[str, int]]] = {}
+    for (target, year, sign), freq in by_target.items():
+        for party in member_parties.get(_index.wiki_ids[target], []):
+            years = by_party.setdefault(party, {})
+            years.setdefault(year, {"opposes": 0, "supports": 0})[sign] += freq
+
+    results = []
+    for party, years in by_party.items():
+        info = _parties_info.get(party, {})
+        results.append(
+            {
+                "wiki_id": party,
+                "name": info.get("party_label", party),
+                "image_url": info.get("party_logo", NO_IMAGE),
+                "opposes": sum(v["opposes"] for v in years.values()),
+                "supports": sum(v["supports"] for v in years.values()),
+                "years": [{"year": year, **years[year]} for year in sorted(years)],
+            }
+        )
+    return sorted(results, key=lambda x: x["opposes"] + x["supports"], reverse=True)
+
+
+def _build_matrices(index: RelationshipIndex) -> Dict[str, Dict[int, Counter]]:
+    matrices: Dict[str, Dict[int, Counter]] = {
+        "who_person_opposes": {},
+        "who_person_supports": {},
+        "who_opposes_person": {},
+        "who_supports_person": {},
+    }
+    for row_nr, row in enumerate(index.rows):
+        rel_type = row["rel_type"]
+        if rel_type.startswith("ent1_"):
+            actor, target = index.ent1[row_nr], index.ent2[row_nr]
+        elif rel_type.startswith("ent2_"):
+            actor, target = index.ent2[row_nr], index.ent1[row_nr]
+        else:
+            continue
+        if "_opposes_" in rel_type:
+            by_actor, by_target = matrices["who_person_opposes"], matrices["who_opposes_person"]
+        elif "_supports_" in rel_type:
+            by_actor, by_target = matrices["who_person_supports"], matrices["who_supports_person"]
+        else:
+            continue
+        by_actor.setdefault(actor, Counter())[target] += 1
+        by_target.setdefault(target, Counter())[actor] += 1
+    return matrices
+
+
+@lru_cache(maxsize=1024)
+def get_top_relationships(wiki_id: str) -> Dict[str, List[Dict[str, Any]]]:
+    """For each of who the person opposes/supports and who opposes/supports the person:
+    the other personalities sorted by how often, with their share of the total."""
+    person = _index.entity_ids.get(wiki_id)
+    top_related = {}
+    for key, matrix in _matrices.items():
+        row = matrix.get(person, Counter()) if person is not None else Counter()
+        total = sum(row.values())
+        top_related[key] = [
+            {
+                "wiki_id": other,
+                "name": all_entities_info[other]["name"],
+                "image_url": all_entities_info[other]["image_url"],
+                "freq": freq,
+                "relative": str(round(freq / total * 100, 2)) + "%",
+            }
+            for other, freq in ((_index.wiki_ids[idx], freq) for idx, freq in row.most_common())
+            if other in all_entities_info
+        ]
+    return top_related
+
+
+def _rebuild() -> None:
+    global _index, _parties_info, _matrices
+    _index = RelationshipIndex(relationships)
+    _parties_info = {entry["wiki_id"]: entry for entry in all_parties_info}
+    _matrices = _build_matrices(_index)
+    get_relationship_between_parties.cache_clear()
+    get_relationship_between_party_and_person.cache_clear()
+    get_relationship_between_person_and_party.cache_clear()
+    get_relationships_aggregate_by_party.cache_clear()
+    get_top_relationships.cache_clear()
+
+
+on_load(_rebuild)
@@ -0,0 +1,92 @@
+import hashlib
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from cache import dataset_version
+from compression import PRECOMPRESSED_ENCODINGS, compress, negotiate
+
+
+def dumps(content: Any) -> bytes:
+    """orjson serializes dataclasses (data_models.Person and friends), dicts, lists and
+    their subclasses natively, and writes the same compact UTF-8 JSON as FastAPI's
+    JSONResponse"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(Response):
+    """Returning one of these from a route skips FastAPI's jsonable_encoder, which walks and
+    copies the whole payload before it is encoded; for responses with thousands of rows
+    that walk costs more than everything else in the request."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# lines are sent in chunks of about this size, except the first one which goes out alone
+NDJSON_CHUNK_SIZE = 64 * 1024
+
+
+def _ndjson_chunks(lines: Iterable[Any]) -> Iterator[bytes]:
+    buffer = bytearray()
+    first = True
+    for line in lines:
+        buffer += dumps(line)
+        buffer += b"\n"
+        if first or len(buffer) >= NDJSON_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+            first = False
+    if buffer:
+        yield bytes(buffer)
+
+
+def ndjson_response(lines: Iterable[Any]) -> StreamingResponse:
+    """Streams `lines` as newline-delimited JSON while they are being produced. A generator
+    is consumed in Starlette's threadpool, so whatever it does before its first line, e.g.
+    a SPARQL query, doesn't block the event loop either."""
+    return StreamingResponse(_ndjson_chunks(lines), media_type="application/x-ndjson")
+
+
+class CachedJSON:
+    """A JSON payload that only changes when the caches are regenerated, serialized to bytes
+    once per dataset version instead of being re-encoded on every request, and compressed
+    then too, at the highest level, for every encoding in PRECOMPRESSED_ENCODINGS.
+
+    The ETag is a hash of those bytes, so a client revalidating with If-None-Match gets a
+    304 and no body at all while the data stays the same. Each encoding gets its own
+    ETag, they are different representations."""
+
+    def __init__(self, build: Callable[[], Any]):
+        self._build = build
+        self._version: Optional[str] = None
+        self.body = b""
+        self.etag = ""
+        self.encoded: Dict[str, bytes] = {}
+
+    def _refresh(self) -> None:
+        version = dataset_version()
+        if version == self._version:
+            return
+        body = dumps(self._build())
+        self.encoded = {encoding: compress(body, encoding) for encoding in PRECOMPRESSED_ENCODINGS}
+        self.body, self.etag = body, hashlib.sha1(body).hexdigest()
+        self._version = version
+
+    def response(self, request: Request) -> Response:
+        self._refresh()
+        encoding = negotiate(request.headers.get("accept-encoding", ""), PRECOMPRESSED_ENCODINGS)
+        etag = f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+        # no-cache: browsers may keep the body, but must revalidate it, which is what the ETag is for
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(content=self.encoded[encoding], media_type="application/json", headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
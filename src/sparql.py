@@ -4,12 +4,13 @@ from collections import defaultdict
 from functools import lru_cache
 from random import randint
 from time import sleep
-from typing import List
+from typing import FrozenSet, Iterable, List, Optional, Tuple
 
 from SPARQLWrapper import SPARQLWrapper, JSON
-from cache import all_entities_info
+from cache import all_entities_info, on_load
 from config import NO_IMAGE, politiquices_endpoint, party_logo_url, wikidata_endpoint, LANG
 from data_models import Element, Person, PoliticalParty
+from person_history import PersonHistory
 from utils import make_https, _process_rel_type, invert_relationship
 
 from sparql_prefixes import PREFIXES
@@ -133,19 +134,28 @@ def get_persons_articles_freq():
     return top_freq
 
 
-# Political Parties
-def get_wiki_id_affiliated_with_party(political_party: str):
-    query = f"""
-        SELECT DISTINCT ?wiki_id {{
-            ?wiki_id wdt:P102 wd:{political_party}; .
-        }}
-    """
-    results = query_sparql(PREFIXES + "\n" + query, "wikidata")
-    return [x["wiki_id"]["value"].split("/")[-1] for x in results["results"]["bindings"]]
-
-
 # Personality Information
-def get_person_info(wiki_id):
+# Person field -> key of get_person_detailed_info(), the query each one comes from
+PERSON_DETAILS = {
+    "positions": "position",
+    "education": "education",
+    "occupations": "occupation",
+    "governments": "government",
+    "assemblies": "assembly",
+}
+
+
+def get_person_info(wiki_id, fields: Optional[FrozenSet[str]] = None):
+    """`fields`, when given, are the Person fields the caller needs, the Wikidata queries
+    for none of them aren't sent and those fields are left empty"""
+    details = None if fields is None else {PERSON_DETAILS[f] for f in fields if f in PERSON_DETAILS}
+    if fields is not None and not fields.intersection({"name", "image_url", "parties"}):
+        results = get_person_detailed_info(wiki_id, details) if details else {}
+        return Person(
+            wiki_id=wiki_id,
+            **{field: results.get(key, []) for field, key in PERSON_DETAILS.items()},
+        )
+
     query = f"""
         SELECT ?name ?image_url ?political_party_logo ?political_party ?political_party_label
         WHERE {{
@@ -185,22 +195,21 @@ def get_person_info(wiki_id):
             if party not in parties:
                 parties.append(party)
 
-    results = get_person_detailed_info(wiki_id)
+    results = get_person_detailed_info(wiki_id, details) if details is None or details else {}
 
     return Person(
         wiki_id=wiki_id,
         name=name,
         image_url=image_url,
         parties=parties,
-        positions=results["position"],
-        education=results["education"],
-        occupations=results["occupation"],
-        governments=results["government"],
-        assemblies=results["assembly"],
+        **{field: results.get(key, []) for field, key in PERSON_DETAILS.items()},
     )
 
 
-def get_person_detailed_info(wiki_id):
+def get_person_detailed_info(wiki_id, parts: Optional[Iterable[str]] = None):
+    """occupation, education, position, government and assembly, each from its own query;
+    with `parts` only those are queried, the others come back empty"""
+    parts = set(parts) if parts is not None else set(PERSON_DETAILS.values())
     occupation_query = f"""
         SELECT DISTINCT ?occupation ?occupation_label
         WHERE {{
@@ -244,32 +253,42 @@ def get_person_detailed_info(wiki_id):
             ?parliamentary_term rdfs:label ?parliamentary_term_label . FILTER(LANG(?parliamentary_term_label) = "{LANG}").
         }}"""
 
-    results = query_sparql(PREFIXES + "\n" + occupation_query, "wikidata")
     occupations = []
-    for x in results["results"]["bindings"]:
-        if x["occupation_label"]["value"] == "político":
-            continue
-        occupations.append(Element(x["occupation"]["value"], x["occupation_label"]["value"]))
-
-    results = query_sparql(PREFIXES + "\n" + education_query, "wikidata")
-    education = [
-        Element(x["educatedAt"]["value"], x["educatedAt_label"]["value"]) for x in results["results"]["bindings"]
-    ]
-
-    results = query_sparql(PREFIXES + "\n" + positions_query, "wikidata")
-    positions = [Element(x["position"]["value"], x["position_label"]["value"]) for x in results["results"]["bindings"]]
-
-    results = query_sparql(PREFIXES + "\n" + governments_query, "wikidata")
-    governments = [
-        Element(x["government"]["value"], x["government_label"]["value"]) for x in results["results"]["bindings"]
-    ]
-
-    results = query_sparql(PREFIXES + "\n" + assemblies_query, "wikidata")
-
-    assemblies = [
-        Element(x["parliamentary_term"]["value"], x["parliamentary_term_label"]["value"])
-        for x in results["results"]["bindings"]
-    ]
+    if "occupation" in parts:
+        results = query_sparql(PREFIXES + "\n" + occupation_query, "wikidata")
+        for x in results["results"]["bindings"]:
+            if x["occupation_label"]["value"] == "político":
+                continue
+            occupations.append(Element(x["occupation"]["value"], x["occupation_label"]["value"]))
+
+    education = []
+    if "education" in parts:
+        results = query_sparql(PREFIXES + "\n" + education_query, "wikidata")
+        education = [
+            Element(x["educatedAt"]["value"], x["educatedAt_label"]["value"]) for x in results["results"]["bindings"]
+        ]
+
+    positions = []
+    if "position" in parts:
+        results = query_sparql(PREFIXES + "\n" + positions_query, "wikidata")
+        positions = [
+            Element(x["position"]["value"], x["position_label"]["value"]) for x in results["results"]["bindings"]
+        ]
+
+    governments = []
+    if "government" in parts:
+        results = query_sparql(PREFIXES + "\n" + governments_query, "wikidata")
+        governments = [
+            Element(x["government"]["value"], x["government_label"]["value"]) for x in results["results"]["bindings"]
+        ]
+
+    assemblies = []
+    if "assembly" in parts:
+        results = query_sparql(PREFIXES + "\n" + assemblies_query, "wikidata")
+        assemblies = [
+            Element(x["parliamentary_term"]["value"], x["parliamentary_term_label"]["value"])
+            for x in results["results"]["bindings"]
+        ]
 
     return {
         "education": education,
@@ -284,9 +303,9 @@ def get_person_detailed_info(wiki_id):
 def _classify_person_relationship(binding, wiki_id):
     """One SPARQL binding + the focal wiki_id -> (rel_type, other_ent_url,
     other_ent_name, focus_ent) from wiki_id's perspective, or None if the binding
-    doesn't resolve to a known rel_type/side. Shared by get_person_relationships
-    (full history) and get_person_relationships_for_year (year-filtered), so the
-    two queries can't drift on how a raw ent1_opposes_ent2/ent2_supports_ent1/
+    doesn't resolve to a known rel_type/side. Used by get_person_history, which
+    every per-person view (full history, per year, per bucket) is cut from, so
+    they can't drift on how a raw ent1_opposes_ent2/ent2_supports_ent1/
     mutual_*/other triple maps onto this person's opposes/supports/opposed_by/
     supported_by/... bucket."""
     # pylint: disable=too-many-branches, too-many-return-statements
@@ -391,8 +410,11 @@ def _classify_person_relationship(binding, wiki_id):
     return None
 
 
-def get_person_relationships(wiki_id):
-    # pylint: disable=too-many-branches, too-many-statements
+@lru_cache(maxsize=256)
+def get_person_history(wiki_id: str) -> PersonHistory:
+    """A person's full relationship history, queried once and then kept: the per-year and
+    per-bucket views below are all slices of it, the frontend walking year by year over
+    the same person used to send one FILTER(YEAR(?date) = ...) query per year."""
     query = f"""
         SELECT DISTINCT ?arquivo_doc ?date ?creator ?publisher ?title ?description ?rel_type ?ent1 ?ent1_str ?ent2 ?ent2_str
         WHERE {{
@@ -416,16 +438,14 @@ def get_person_relationships(wiki_id):
         """
 
     results = query_sparql(PREFIXES + "\n" + query, "politiquices")
-    relations = defaultdict(list)
-
+    articles = []
     for e in results["results"]["bindings"]:
         classified = _classify_person_relationship(e, wiki_id)
         if classified is None:
             continue
         rel_type, other_ent_url, other_ent_name, focus_ent = classified
-
         try:
-            relations[rel_type].append(
+            articles.append(
                 {
                     "arquivo_doc": e["arquivo_doc"]["value"],
                     "title": e["title"]["value"],
@@ -446,6 +466,18 @@ def get_person_relationships(wiki_id):
             print("KeyError:", error)
             continue
 
+    return PersonHistory(articles)
+
+
+# a reload of the cache may come with new articles
+on_load(get_person_history.cache_clear)
+
+
+def get_person_relationships(wiki_id):
+    relations = defaultdict(list)
+    for article in get_person_history(wiki_id).rows:
+        relations[article["rel_type"]].append(article)
+
     all_relationships = []
     sentiment_only = []
     for rel_type in relations.keys():  # pylint: disable=consider-using-dict-items
@@ -459,177 +491,31 @@ def get_person_relationships(wiki_id):
     return relations
 
 
-@lru_cache(maxsize=256)
-def get_person_relationships_for_year(wiki_id, year):
-    query = f"""
-        SELECT DISTINCT ?arquivo_doc ?date ?creator ?publisher ?title ?description ?rel_type ?ent1 ?ent1_str ?ent2 ?ent2_str
-        WHERE {{
-         {{ ?rel politiquices:ent1 wd:{wiki_id} }} UNION {{ ?rel politiquices:ent2 wd:{wiki_id} }}
-
-            ?rel politiquices:type ?rel_type.
-
-             ?rel politiquices:ent1 ?ent1 ;
-                  politiquices:ent2 ?ent2 ;
-                  politiquices:ent1_str ?ent1_str ;
-                  politiquices:ent2_str ?ent2_str ;
-                  politiquices:url ?arquivo_doc .
+def get_person_relationships_normalized(wiki_id):
+    """get_person_relationships' buckets without the copies: every article once, in the
+    'articles' table, newest first, and each bucket as a list of indexes into it, in the
+    same order get_person_relationships lists them."""
+    rows = get_person_history(wiki_id).rows
+    last = len(rows) - 1
+    buckets = defaultdict(list)
+    for idx, article in enumerate(rows):
+        buckets[article["rel_type"]].append(last - idx)
+    buckets["all"] = list(range(len(rows)))
+    buckets["sentiment"] = [idx for idx in range(len(rows)) if rows[last - idx]["rel_type"] in {"opposes", "supports"}]
+    return {"articles": rows[::-1], "buckets": buckets}
 
-              ?arquivo_doc dc:title ?title ;
-                           dc:description ?description;
-                           dc:creator ?creator;
-                           dc:publisher ?publisher;
-                           dc:date  ?date . FILTER(YEAR(?date) = {year})
-        }}
-        ORDER BY ASC(?date)
-        """
 
-    results = query_sparql(PREFIXES + "\n" + query, "politiquices")
-    articles = []
-    for e in results["results"]["bindings"]:
-        classified = _classify_person_relationship(e, wiki_id)
-        if classified is None:
-            continue
-        rel_type, other_ent_url, other_ent_name, focus_ent = classified
-        try:
-            articles.append(
-                {
-                    "arquivo_doc": e["arquivo_doc"]["value"],
-                    "title": e["title"]["value"],
-                    "domain": e["creator"]["value"],
-                    "original_url": e["publisher"]["value"],
-                    "paragraph": e["description"]["value"],
-                    "date": e["date"]["value"].split("T")[0],
-                    "ent1_id": wiki_id,
-                    "ent1_img": all_entities_info[wiki_id]["image_url"],
-                    "ent1_str": focus_ent,
-                    "ent2_id": other_ent_url,
-                    "ent2_img": all_entities_info[other_ent_url]["image_url"],
-                    "ent2_str": other_ent_name,
-                    "rel_type": rel_type,
-                }
-            )
-        except KeyError as error:
-            print("KeyError:", error)
-            continue
-
-    return sorted(articles, key=lambda x: x["date"], reverse=True)
-
-
-def get_top_relationships(wiki_id):
-    # get all the relationships where the person acts as subject, i.e: opposes and supports
-    query = f"""
-        SELECT ?rel_type ?ent2
-        WHERE {{
-          {{
-            ?rel politiquices:ent1 wd:{wiki_id};
-                 politiquices:ent2 ?ent2;
-                 politiquices:type ?rel_type.
-                 FILTER(REGEX((?rel_type), "^ent1_opposes|ent1_supports"))
-          }}
-          UNION
-          {{
-            ?rel politiquices:ent2 wd:{wiki_id};
-                 politiquices:ent1 ?ent2;
-                 politiquices:type ?rel_type.
-                 FILTER(REGEX((?rel_type), "^ent2_opposes|ent2_supports"))
-          }}
-        }}
-        """
-    results = query_sparql(PREFIXES + "\n" + query, "politiquices")
-    person_as_subject = defaultdict(lambda: defaultdict(int))
-    for x in results["results"]["bindings"]:
-        other_person = x["ent2"]["value"].split("/")[-1]
-        if "opposes" in x["rel_type"]["value"]:
-            person_as_subject["who_person_opposes"][other_person] += 1
-        if "supports" in x["rel_type"]["value"]:
-            person_as_subject["who_person_supports"][other_person] += 1
+def get_person_relationships_for_year(wiki_id, year):
+    return get_person_relationships_for_years(wiki_id, year, year)
 
-    # get all the relationships where the person acts as target, i.e.: is opposed/supported by
-    query = f"""
-        SELECT ?rel_type ?ent2
-        WHERE {{
-          {{
-            ?rel politiquices:ent1 wd:{wiki_id};
-                 politiquices:ent2 ?ent2;
-                 politiquices:type ?rel_type.
-                 FILTER(REGEX((?rel_type), "^ent2_opposes|ent2_supports"))
-          }}
-          UNION
-          {{
-            ?rel politiquices:ent2 wd:{wiki_id};
-                 politiquices:ent1 ?ent2;
-                 politiquices:type ?rel_type.
-                 FILTER(REGEX((?rel_type), "^ent1_opposes|ent1_supports"))
-          }}
-        }}
-        """
-    results = query_sparql(PREFIXES + "\n" + query, "politiquices")
-    person_as_target = defaultdict(lambda: defaultdict(int))
-    for x in results["results"]["bindings"]:
-        other_person = x["ent2"]["value"].split("/")[-1]
-        if "opposes" in x["rel_type"]["value"]:
-            person_as_target["who_opposes_person"][other_person] += 1
-        if "supports" in x["rel_type"]["value"]:
-            person_as_target["who_supports_person"][other_person] += 1
-
-    total = sum(person_as_subject["who_person_opposes"].values())
-    who_person_opposes = [
-        {
-            "wiki_id": k,
-            "name": all_entities_info[k]["name"],
-            "image_url": all_entities_info[k]["image_url"],
-            "freq": v,
-            "relative": str(round(v / total * 100, 2)) + "%",
-        }
-        for k, v in person_as_subject["who_person_opposes"].items()
-        if k in all_entities_info
-    ]
-
-    total = sum(person_as_subject["who_person_supports"].values())
-    who_person_supports = [
-        {
-            "wiki_id": k,
-            "name": all_entities_info[k]["name"],
-            "image_url": all_entities_info[k]["image_url"],
-            "freq": v,
-            "relative": str(round(v / total * 100, 2)) + "%",
-        }
-        for k, v in person_as_subject["who_person_supports"].items()
-        if k in all_entities_info
-    ]
-
-    total = sum(person_as_target["who_opposes_person"].values())
-    who_opposes_person = [
-        {
-            "wiki_id": k,
-            "name": all_entities_info[k]["name"],
-            "image_url": all_entities_info[k]["image_url"],
-            "freq": v,
-            "relative": str(round(v / total * 100, 2)) + "%",
-        }
-        for k, v in person_as_target["who_opposes_person"].items()
-        if k in all_entities_info
-    ]
-
-    total = sum(person_as_target["who_supports_person"].values())
-    who_supports_person = [
-        {
-            "wiki_id": k,
-            "name": all_entities_info[k]["name"],
-            "image_url": all_entities_info[k]["image_url"],
-            "freq": v,
-            "relative": str(round(v / total * 100, 2)) + "%",
-        }
-        for k, v in person_as_target["who_supports_person"].items()
-        if k in all_entities_info
-    ]
 
-    return {
-        "who_person_opposes": sorted(who_person_opposes, key=lambda x: x["freq"], reverse=True),
-        "who_person_supports": sorted(who_person_supports, key=lambda x: x["freq"], reverse=True),
-        "who_opposes_person": sorted(who_opposes_person, key=lambda x: x["freq"], reverse=True),
-        "who_supports_person": sorted(who_supports_person, key=lambda x: x["freq"], reverse=True),
-    }
+def get_person_relationships_for_years(wiki_id, start_year, end_year):
+    history = get_person_history(wiki_id)
+    if start_year == end_year:
+        articles = history.for_year(int(start_year))
+    else:
+        articles = history.for_years(int(start_year), int(end_year))
+    return articles[::-1]
 
 
 def get_person_relationships_by_year(wiki_id, rel_type, ent="ent1"):
@@ -665,13 +551,35 @@ def get_person_relationships_by_year(wiki_id, rel_type, ent="ent1"):
 
 
 # relationship queries
+
+# response field -> (SPARQL variable, predicate) of the optional article metadata; the
+# triple pattern and the variable are only in the query when the field is requested
+_ARTICLE_FIELDS = {
+    "title": ("title", "dc:title"),
+    "domain": ("creator", "dc:creator"),
+    "original_url": ("publisher", "dc:publisher"),
+    "paragraph": ("description", "dc:description"),
+}
+
+
 @lru_cache(maxsize=50)
-def get_relationship_between_two_persons(wiki_id_one, wiki_id_two, rel_type, start_year, end_year):
+def get_relationship_between_two_persons(
+    wiki_id_one, wiki_id_two, rel_type, start_year, end_year, fields: Optional[FrozenSet[str]] = None
+):
+    """`fields`, when given, selects the keys of each returned row, and drops the article
+    metadata nobody asked for from the query itself"""
 
     rel_type, rel_type_inverted = _process_rel_type(rel_type)
+    article_fields = [f for f in _ARTICLE_FIELDS if fields is None or f in fields]
+    variables = " ".join("?" + _ARTICLE_FIELDS[f][0] for f in article_fields)
+    article_patterns = "".join(
+        f"""
+                           {_ARTICLE_FIELDS[f][1]} ?{_ARTICLE_FIELDS[f][0]};"""
+        for f in article_fields
+    )
 
     query = f"""
-        SELECT DISTINCT ?arquivo_doc ?creator ?publisher ?date ?title ?description ?rel_type ?ent1 ?ent1_str ?ent2 ?ent2_str
+        SELECT DISTINCT ?arquivo_doc ?date {variables} ?rel_type ?ent1 ?ent1_str ?ent2 ?ent2_str
         WHERE {{
             {{
               ?rel politiquices:ent1 wd:{wiki_id_one};
@@ -683,10 +591,7 @@ def get_relationship_between_two_persons(wiki_id_one, wiki_id_two, rel_type, sta
                    politiquices:ent2_str ?ent2_str;
                    politiquices:type ?rel_type. FILTER REGEX(?rel_type, '{rel_type}')
 
-              ?arquivo_doc dc:title ?title ;
-                           dc:description ?description;
-                           dc:creator ?creator;
-                           dc:publisher ?publisher;
+              ?arquivo_doc {article_patterns}
                            dc:date ?date . FILTER(YEAR(?date)>={start_year} && YEAR(?date)<={end_year})
            }}
            UNION
@@ -700,10 +605,7 @@ def get_relationship_between_two_persons(wiki_id_one, wiki_id_two, rel_type, sta
                    politiquices:ent2_str ?ent2_str;
                    politiquices:type ?rel_type. FILTER REGEX(?rel_type, '{rel_type_inverted}')
 
-              ?arquivo_doc dc:title ?title;
-                           dc:description ?description;              
-                           dc:creator ?creator;
-                           dc:publisher ?publisher;
+              ?arquivo_doc {article_patterns}
                            dc:date ?date . FILTER(YEAR(?date)>={start_year} && YEAR(?date)<={end_year})
 
            }}
@@ -721,253 +623,23 @@ def get_relationship_between_two_persons(wiki_id_one, wiki_id_two, rel_type, sta
         ent1_wiki_id = x["ent1"]["value"].split("/")[-1]
         if ent1_wiki_id == wiki_id_two:
             rel_type_result = invert_relationship(rel_type_result)
-        results.append(
-            {
-                "arquivo_doc": x["arquivo_doc"]["value"],
-                "date": x["date"]["value"],
-                "title": x["title"]["value"],
-                "domain": x["creator"]["value"],
-                "original_url": x["publisher"]["value"],
-                "paragraph": x["description"]["value"],
-                "rel_type": rel_type_result,
-                "ent1_id": wiki_id_one,
-                "ent1_str": all_entities_info[wiki_id_one]["name"],
-                "ent2_id": wiki_id_two,
-                "ent2_str": all_entities_info[wiki_id_two]["name"],
-                "ent1_img": all_entities_info[wiki_id_one]["image_url"],
-                "ent2_img": all_entities_info[wiki_id_two]["image_url"],
-            }
-        )
-
-    return results
-
-
-@lru_cache(maxsize=50)
-def get_relationship_between_party_and_person(party, person, rel_type, start_year, end_year):
-    rel_type, rel_type_inverted = _process_rel_type(rel_type)
-
-    query = f"""
-        SELECT DISTINCT ?ent1 ?ent1_str ?ent2 ?ent2_str ?rel_type ?arquivo_doc ?date ?title ?description ?creator ?publisher
-        WHERE {{
-            {{
-                ?rel politiquices:ent1 ?ent1;
-                     politiquices:ent2 ?ent2 . FILTER(?ent2=wd:{person})
-                ?rel politiquices:ent1_str ?ent1_str;
-                     politiquices:ent2_str ?ent2_str;
-                     politiquices:url ?arquivo_doc;
-                     politiquices:type ?rel_type. FILTER REGEX(?rel_type, '{rel_type}')
-                ?arquivo_doc dc:title ?title;
-                             dc:description ?description; 
-                             dc:creator ?creator;
-                             dc:publisher ?publisher;
-                             dc:date ?date. FILTER(YEAR(?date)>={start_year} && YEAR(?date)<={end_year})
-             }}
-                UNION
-            {{
-                ?rel politiquices:ent2 ?ent1;
-                     politiquices:ent1 ?ent2 . FILTER(?ent2=wd:{person})
-                ?rel politiquices:ent1_str ?ent1_str;
-                     politiquices:ent2_str ?ent2_str;
-                     politiquices:url ?arquivo_doc;
-                     politiquices:type ?rel_type. FILTER REGEX(?rel_type, '{rel_type_inverted}')
-
-                ?arquivo_doc dc:title ?title;
-                             dc:description ?description;                
-                             dc:creator ?creator;
-                             dc:publisher ?publisher;
-                             dc:date ?date. FILTER(YEAR(?date)>={start_year} && YEAR(?date)<={end_year})
-
-             }}
-
-            SERVICE <{wikidata_endpoint}> {{
-                ?ent1 wdt:P102 wd:{party} .
-                OPTIONAL {{ ?ent1 rdfs:label ?personLabel_pt   . FILTER(LANG(?personLabel_pt)   = "pt") }}
-                OPTIONAL {{ ?ent1 rdfs:label ?personLabel_ptbr . FILTER(LANG(?personLabel_ptbr) = "pt-br") }}
-                OPTIONAL {{ ?ent1 rdfs:label ?personLabel_en   . FILTER(LANG(?personLabel_en)   = "en") }}
-                OPTIONAL {{ ?ent1 rdfs:label ?personLabel_mul  . FILTER(LANG(?personLabel_mul)  = "mul") }}
-                BIND(COALESCE(?personLabel_pt, ?personLabel_ptbr, ?personLabel_en, ?personLabel_mul) AS ?personLabel)
-                FILTER(BOUND(?personLabel))
-            }}
-        }}
-        ORDER BY DESC(?date)
-        """
-
-    result = query_sparql(PREFIXES + "\n" + query, "politiquices")
-    results = []
-    for x in result["results"]["bindings"]:
-        results.append(
-            {
-                "arquivo_doc": x["arquivo_doc"]["value"],
-                "date": x["date"]["value"],
-                "title": x["title"]["value"],
-                "domain": x["creator"]["value"],
-                "original_url": x["publisher"]["value"],
-                "paragraph": x["description"]["value"],
-                "rel_type": x["rel_type"]["value"],
-                "ent1_id": x["ent1"]["value"].split("/")[-1],
-                "ent1_str": x["ent1_str"]["value"],
-                "ent2_id": x["ent2"]["value"].split("/")[-1],
-                "ent2_str": x["ent2_str"]["value"],
-                "ent1_img": all_entities_info[x["ent1"]["value"].split("/")[-1]]["image_url"],
-                "ent2_img": all_entities_info[x["ent2"]["value"].split("/")[-1]]["image_url"],
-            }
-        )
-
-    return results
-
-
-@lru_cache(maxsize=50)
-def get_relationship_between_person_and_party(person, party, relation, start_year, end_year):
-    rel_type, rel_type_inverted = _process_rel_type(relation)
-
-    query = f"""
-        SELECT DISTINCT ?ent1 ?ent2 ?ent2_str ?ent1_str ?rel_type ?arquivo_doc ?date ?title ?description ?creator ?publisher
-        WHERE {{
-            {{
-                ?rel politiquices:ent2 ?ent2;
-                     politiquices:ent1 ?ent1 . FILTER(?ent1=wd:{person})
-                ?rel politiquices:ent1_str ?ent1_str;
-                     politiquices:ent2_str ?ent2_str;
-                     politiquices:url ?arquivo_doc;
-                     politiquices:type ?rel_type. FILTER REGEX(?rel_type, '{rel_type}')
-                ?arquivo_doc dc:title ?title;
-                             dc:description ?description;
-                             dc:creator ?creator;
-                             dc:publisher ?publisher;
-                             dc:date ?date; FILTER(YEAR(?date)>={start_year} && YEAR(?date)<={end_year})
-            }}
-              UNION
-            {{
-                ?rel politiquices:ent1 ?ent2;
-                     politiquices:ent2 ?ent1 . FILTER(?ent1=wd:{person})
-                ?rel politiquices:ent1_str ?ent1_str;
-                     politiquices:ent2_str ?ent2_str;
-                     politiquices:url ?arquivo_doc;
-                     politiquices:type ?rel_type. FILTER REGEX(?rel_type, '{rel_type_inverted}')
-                ?arquivo_doc dc:title ?title;
-                             dc:description ?description;
-                             dc:creator ?creator;
-                             dc:publisher ?publisher;
-                             dc:date ?date; FILTER(YEAR(?date)>={start_year} && YEAR(?date)<={end_year})
-            }}
-
-            SERVICE <{wikidata_endpoint}> {{
-                ?ent2 wdt:P102 wd:{party} .
-                OPTIONAL {{ ?ent2 rdfs:label ?personLabel_pt   . FILTER(LANG(?personLabel_pt)   = "pt") }}
-                OPTIONAL {{ ?ent2 rdfs:label ?personLabel_ptbr . FILTER(LANG(?personLabel_ptbr) = "pt-br") }}
-                OPTIONAL {{ ?ent2 rdfs:label ?personLabel_en   . FILTER(LANG(?personLabel_en)   = "en") }}
-                OPTIONAL {{ ?ent2 rdfs:label ?personLabel_mul  . FILTER(LANG(?personLabel_mul)  = "mul") }}
-                BIND(COALESCE(?personLabel_pt, ?personLabel_ptbr, ?personLabel_en, ?personLabel_mul) AS ?personLabel)
-                FILTER(BOUND(?personLabel))
-            }}
-        }}
-        ORDER BY DESC(?date)
-        """
-
-    result = query_sparql(PREFIXES + "\n" + query, "politiquices")
-    results = []
-    for x in result["results"]["bindings"]:
-        results.append(
-            {
-                "arquivo_doc": x["arquivo_doc"]["value"],
-                "date": x["date"]["value"],
-                "title": x["title"]["value"],
-                "domain": x["creator"]["value"],
-                "original_url": x["publisher"]["value"],
-                "paragraph": x["description"]["value"],
-                "rel_type": x["rel_type"]["value"],
-                "ent1_id": x["ent1"]["value"].split("/")[-1],
-                "ent1_str": x["ent1_str"]["value"],
-                "ent2_id": x["ent2"]["value"].split("/")[-1],
-                "ent2_str": x["ent2_str"]["value"],
-                "ent1_img": all_entities_info[x["ent1"]["value"].split("/")[-1]]["image_url"],
-                "ent2_img": all_entities_info[x["ent2"]["value"].split("/")[-1]]["image_url"],
-            }
-        )
+        row = {
+            "arquivo_doc": x["arquivo_doc"]["value"],
+            "date": x["date"]["value"],
+            **{f: x[_ARTICLE_FIELDS[f][0]]["value"] for f in article_fields},
+            "rel_type": rel_type_result,
+            "ent1_id": wiki_id_one,
+            "ent1_str": all_entities_info[wiki_id_one]["name"],
+            "ent2_id": wiki_id_two,
+            "ent2_str": all_entities_info[wiki_id_two]["name"],
+            "ent1_img": all_entities_info[wiki_id_one]["image_url"],
+            "ent2_img": all_entities_info[wiki_id_two]["image_url"],
+        }
+        results.append(row if fields is None else {key: row[key] for key in row if key in fields})
 
     return results
 
 
-@lru_cache(maxsize=50)
-def get_relationship_between_parties(per_party_a, per_party_b, relation, start_year, end_year):
-    rel_type, rel_type_inverted = _process_rel_type(relation)
-
-    query = f"""
-    SELECT DISTINCT ?person_party_a ?ent1_str ?person_party_b ?ent2_str ?arquivo_doc ?date ?creator ?publisher ?title ?description ?rel_type
-    WHERE {{
-      {{
-        VALUES ?person_party_a {{ {per_party_a} }}
-        VALUES ?person_party_b {{ {per_party_b} }}
-      }}
-
-      {{ ?rel politiquices:ent1 ?person_party_a;
-              politiquices:ent2 ?person_party_b;
-              politiquices:ent1_str ?ent1_str;
-              politiquices:ent2_str ?ent2_str;
-              {{
-                SELECT ?rel ?rel_type ?arquivo_doc ?title ?description ?creator ?publisher ?date
-                WHERE {{
-                     ?rel politiquices:url ?arquivo_doc;
-                          politiquices:type ?rel_type. FILTER REGEX(?rel_type, '{rel_type}')
-
-                      ?arquivo_doc dc:title ?title;
-                                   dc:description ?description;
-                                   dc:creator ?creator;
-                                   dc:publisher ?publisher;
-                                   dc:date ?date;
-                                   FILTER(YEAR(?date)>={start_year} && YEAR(?date)<={end_year})
-                }}
-             }}
-      }}
-
-      UNION
-
-      {{ ?rel politiquices:ent1 ?person_party_b;
-              politiquices:ent2 ?person_party_a;
-              politiquices:ent1_str ?ent1_str;
-              politiquices:ent2_str ?ent2_str;
-              {{
-                SELECT ?rel ?rel_type ?arquivo_doc ?title ?description ?creator ?publisher ?date
-                WHERE {{
-                      ?rel politiquices:url ?arquivo_doc;
-                           politiquices:type ?rel_type. FILTER REGEX(?rel_type, '{rel_type_inverted}')
-
-                      ?arquivo_doc dc:title ?title;
-                                   dc:description ?description;
-                                   dc:creator ?creator;
-                                   dc:publisher ?publisher;
-                                   dc:date ?date;
-                                   FILTER(YEAR(?date)>={start_year} && YEAR(?date)<={end_year})
-                }}
-              }}
-      }}
-    }}
-    """
-
-    result = query_sparql(PREFIXES + "\n" + query, "politiquices")
-    relationships = []
-    for x in result["results"]["bindings"]:
-        relationships.append(
-            {
-                "arquivo_doc": x["arquivo_doc"]["value"],
-                "date": x["date"]["value"],
-                "title": x["title"]["value"],
-                "domain": x["creator"]["value"],
-                "original_url": x["publisher"]["value"],
-                "paragraph": x["description"]["value"],
-                "rel_type": x["rel_type"]["value"],
-                "ent1_id": x["person_party_a"]["value"].split("/")[-1],
-                "ent1_str": x["ent1_str"]["value"],
-                "ent2_id": x["person_party_b"]["value"].split("/")[-1],
-                "ent2_str": x["ent2_str"]["value"],
-                "ent1_img": all_entities_info[x["person_party_a"]["value"].split("/")[-1]]["image_url"],
-                "ent2_img": all_entities_info[x["person_party_b"]["value"].split("/")[-1]]["image_url"],
-            }
-        )
-
-    return relationships
-
-
 def get_timeline_personalities(wiki_ids: List[str], only_among_selected: bool, only_sentiment: bool, start_year: str, end_year: str):
     values = " ".join(["wd:" + wiki_id for wiki_id in wiki_ids])
 
@@ -1049,236 +721,6 @@ def get_timeline_personalities(wiki_ids: List[str], only_among_selected: bool, o
     return news
 
 
-def get_personalities_by_education(institution_wiki_id: str):
-    query = f"""
-    SELECT ?ent1 ?ent1_name ?entity_label
-    (GROUP_CONCAT(DISTINCT ?image_url;separator=",") as ?images_url)
-    WHERE {{
-        ?ent1 wdt:P31 wd:Q5;
-              rdfs:label ?ent1_name;
-              p:P69 ?educatedAtStmnt.
-        ?educatedAtStmnt ps:P69 wd:{institution_wiki_id} .
-        wd:{institution_wiki_id} rdfs:label ?entity_label .
-        OPTIONAL {{ ?ent1 wdt:P18 ?image_url. }}
-        FILTER(LANG(?ent1_name) = "{LANG}")
-        FILTER(LANG(?entity_label) = "{LANG}")
-      }}
-    GROUP BY ?ent1 ?ent1_name ?entity_label
-    ORDER BY ASC(?ent1_name)
-    """
-    result = query_sparql(PREFIXES + "\n" + query, "wikidata")
-
-    for r in result["results"]["bindings"]:
-        if "images_url" not in r:
-            r["image_url"] = {}
-            r["image_url"]["type"] = "uri"
-            r["image_url"]["value"] = NO_IMAGE
-        else:
-            if images := r["images_url"]["value"].split(","):
-                r["image_url"] = r.pop("images_url")
-                r["image_url"]["value"] = images[0]
-            else:
-                r["image_url"] = r.pop("images_url")
-
-    return result["results"]["bindings"]
-
-
-def get_personalities_by_occupation(occupation_wiki_id: str):
-    query = f"""
-    SELECT ?ent1 ?ent1_name ?entity_label
-    (GROUP_CONCAT(DISTINCT ?image_url;separator=",") as ?images_url)
-    WHERE {{
-        ?ent1 wdt:P31 wd:Q5;
-              rdfs:label ?ent1_name;
-              p:P106 ?occupationStmnt .
-        ?occupationStmnt ps:P106 wd:{occupation_wiki_id} .
-        wd:{occupation_wiki_id} rdfs:label ?entity_label .
-        OPTIONAL {{ ?ent1 wdt:P18 ?image_url. }}
-        FILTER(LANG(?ent1_name) = "{LANG}")
-        FILTER(LANG(?entity_label) = "{LANG}")
-    }}
-    GROUP BY ?ent1 ?ent1_name ?entity_label
-    ORDER BY ASC(?ent1_name)
-    """
-    result = query_sparql(PREFIXES + "\n" + query, "wikidata")
-
-    for r in result["results"]["bindings"]:
-        if "images_url" not in r:
-            r["image_url"] = {}
-            r["image_url"]["type"] = "uri"
-            r["image_url"]["value"] = NO_IMAGE
-        else:
-            if images := r["images_url"]["value"].split(","):
-                r["image_url"] = r.pop("images_url")
-                r["image_url"]["value"] = images[0]
-            else:
-                r["image_url"] = r.pop("images_url")
-
-    return result["results"]["bindings"]
-
-
-def get_personalities_by_public_office(public_office: str):
-    query = f"""
-    SELECT ?ent1 ?ent1_name
-    (GROUP_CONCAT(DISTINCT ?image_url;separator=",") as ?images_url)
-    WHERE {{
-        ?ent1 wdt:P31 wd:Q5;
-              rdfs:label ?ent1_name;
-              p:P39 ?positionStmnt .
-        ?positionStmnt ps:P39 wd:{public_office} .
-        OPTIONAL {{ ?ent1 wdt:P18 ?image_url. }}
-        FILTER(LANG(?ent1_name) = "{LANG}")
-    }}
-    GROUP BY ?ent1 ?ent1_name
-    ORDER BY ASC(?ent1_name)
-    """
-    result = query_sparql(PREFIXES + "\n" + query, "wikidata")
-
-    for r in result["results"]["bindings"]:
-        if "images_url" not in r:
-            r["image_url"] = {}
-            r["image_url"]["type"] = "uri"
-            r["image_url"]["value"] = NO_IMAGE
-        else:
-            if images := r["images_url"]["value"].split(","):
-                r["image_url"] = r.pop("images_url")
-                r["image_url"]["value"] = images[0]
-            else:
-                r["image_url"] = r.pop("images_url")
-
-    return result["results"]["bindings"]
-
-
-def get_personalities_by_assembly(parliamentary_term: str):
-    # get all other members in politiquices of part of the same assembly/parliament
-    # example of an assembly/parliament in Wikidata: https://www.wikidata.org/wiki/Q71014092
-    query = f"""
-    SELECT DISTINCT ?ent1 ?ent1_name
-    (GROUP_CONCAT(DISTINCT ?image_url;separator=",") as ?images_url)
-    WHERE {{
-        ?ent1 wdt:P31 wd:Q5;
-              wdt:P27 wd:Q45;
-              p:P39 ?officeStmnt;
-              rdfs:label ?ent1_name . FILTER(LANG(?ent1_name) = "{LANG}")
-        ?officeStmnt pq:P2937 wd:{parliamentary_term}.
-        OPTIONAL {{ ?ent1 wdt:P18 ?image_url. }}
-    }}
-    GROUP BY ?ent1 ?ent1_name
-    ORDER BY ASC(?ent1_name)
-    """
-
-    result = query_sparql(PREFIXES + "\n" + query, "wikidata")
-
-    for r in result["results"]["bindings"]:
-        if "images_url" not in r:
-            r["image_url"] = {}
-            r["image_url"]["type"] = "uri"
-            r["image_url"]["value"] = NO_IMAGE
-        else:
-            if images := r["images_url"]["value"].split(","):
-                r["image_url"] = r.pop("images_url")
-                r["image_url"]["value"] = images[0]
-            else:
-                r["image_url"] = r.pop("images_url")
-
-    return result["results"]["bindings"]
-
-
-def get_personalities_by_government(legislature: str):
-    # get all other members of a government in politiquices part of the same government
-    # example of a government in WikiData: https://www.wikidata.org/wiki/Q71014092
-    query = f"""
-    SELECT DISTINCT ?ent1 ?ent1_name
-    (GROUP_CONCAT(DISTINCT ?image_url;separator=",") as ?images_url)
-    WHERE {{
-        ?ent1 wdt:P31 wd:Q5;
-                wdt:P27 wd:Q45;
-                p:P39 ?officeStmnt;
-                rdfs:label ?ent1_name . FILTER(LANG(?ent1_name) = "{LANG}")
-        ?officeStmnt pq:P5054 wd:{legislature}.
-        OPTIONAL {{ ?ent1 wdt:P18 ?image_url. }}
-    }}
-    GROUP BY ?ent1 ?ent1_name
-    ORDER BY ASC(?ent1_name)
-    """
-    result = query_sparql(PREFIXES + "\n" + query, "wikidata")
-
-    for r in result["results"]["bindings"]:
-        if "images_url" not in r:
-            r["image_url"] = {}
-            r["image_url"]["type"] = "uri"
-            r["image_url"]["value"] = NO_IMAGE
-        else:
-            if images := r["images_url"]["value"].split(","):
-                r["image_url"] = r.pop("images_url")
-                r["image_url"]["value"] = images[0]
-            else:
-                r["image_url"] = r.pop("images_url")
-
-    return result["results"]["bindings"]
-
-
-def get_personalities_by_party(political_party: str):
-    query = f"""
-    SELECT DISTINCT ?ent1 ?ent1_name
-    (GROUP_CONCAT(DISTINCT ?image_url;separator=",") as ?images_url)
-    WHERE {{
-        ?ent1 wdt:P31 wd:Q5;
-              wdt:P102 wd:{political_party};
-              rdfs:label ?ent1_name . FILTER(LANG(?ent1_name) = "{LANG}")
-        OPTIONAL {{ ?ent1 wdt:P18 ?image_url. }}
-    }}
-    GROUP BY ?ent1 ?ent1_name
-    ORDER BY ASC(?ent1_name)
-    """
-
-    result = query_sparql(PREFIXES + "\n" + query, "wikidata")
-
-    for r in result["results"]["bindings"]:
-        if "images_url" not in r:
-            r["image_url"] = {}
-            r["image_url"]["type"] = "uri"
-            r["image_url"]["value"] = NO_IMAGE
-        else:
-            if images := r["images_url"]["value"].split(","):
-                r["image_url"] = r.pop("images_url")
-                r["image_url"]["value"] = images[0]
-            else:
-                r["image_url"] = r.pop("images_url")
-
-    return result["results"]["bindings"]
-
-
-def get_relationships_aggregate_by_party(wiki_id: str):
-    # ToDo: ongoing
-    """
-    Shows which parties related more with a certain person through support, opposition relationships.
-    """
-
-    query = f"""
-        SELECT ?rel_type ?ent2 ?noticia ?d
-        WHERE {{
-            {{
-            ?rel politiquices:ent1 {{wd:wiki_id}};
-                 politiquices:ent2 ?ent2;
-                 politiquices:type ?rel_type;
-                 politiquices:url ?noticia.
-            ?noticia dc:date ?d
-            FILTER(REGEX((?rel_type), "^ent1_opposes|ent1_supports"))
-            }}
-            UNION
-            {{
-            ?rel politiquices:ent2 {{wd:wiki_id}};
-                 politiquices:ent1 ?ent2;
-                 politiquices:type ?rel_type;
-                 politiquices:url ?noticia .
-            ?noticia dc:date ?d
-            FILTER(REGEX((?rel_type), "^ent2_opposes|ent2_supports"))
-              }}
-        }}
-        """
-
-
 def get_total_relationships_count() -> int:
     query = """
         SELECT (COUNT(?rel) AS ?total)
@@ -1290,9 +732,28 @@ def get_total_relationships_count() -> int:
     return int(results["results"]["bindings"][0]["total"]["value"])
 
 
-def get_all_relationships_paginated(offset: int = 0, limit: int = 20) -> list:
+# the escapes of a SPARQL string literal, see STRING_LITERAL2 and ECHAR in the grammar
+_LITERAL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"})
+
+
+def _keyset_literal(value: str) -> str:
+    # the keys come back from clients, in cursors: whatever they hold stays a literal
+    return '"' + value.translate(_LITERAL_ESCAPES) + '"'
+
+
+def get_all_relationships_paginated(
+    offset: int = 0, limit: int = 20, after: Optional[Tuple[str, str]] = None
+) -> list:
+    """The relationships in (arquivo_doc, rel) order, `limit` of them from `offset`, or,
+    by keyset, those after `after`, the (arquivo_doc, rel) of the last one already seen,
+    which costs the same however deep the page is"""
+    keyset = ""
+    if after is not None:
+        doc, rel = (_keyset_literal(value) for value in after)
+        keyset = f"FILTER(STR(?arquivo_doc) > {doc} || (STR(?arquivo_doc) = {doc} && STR(?rel) > {rel}))"
     query = f"""
-        SELECT ?arquivo_doc ?date ?creator ?publisher ?title ?description ?rel_type ?ent1 ?ent1_str ?ent2 ?ent2_str
+        SELECT ?rel ?arquivo_doc ?date ?creator ?publisher ?title ?description ?rel_type
+               ?ent1 ?ent1_str ?ent2 ?ent2_str
         WHERE {{
             ?rel politiquices:url ?arquivo_doc ;
                  politiquices:type ?rel_type ;
@@ -1305,8 +766,9 @@ def get_all_relationships_paginated(offset: int = 0, limit: int = 20) -> list:
                          dc:creator ?creator ;
                          dc:publisher ?publisher ;
                          dc:date ?date .
+            {keyset}
         }}
-        ORDER BY ?arquivo_doc
+        ORDER BY STR(?arquivo_doc) STR(?rel)
         LIMIT {limit}
         OFFSET {offset}
         """
@@ -1,9 +1,10 @@
 import re
 import sys
 import urllib.error
+from collections import defaultdict
 from random import randint
 from time import sleep
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from SPARQLWrapper import SPARQLWrapper, JSON
 
@@ -278,3 +279,176 @@ def get_all_persons_images():
         for r in results["results"]["bindings"]
     }
     return transformed
+
+
+def get_persons_party_affiliations(person_wiki_ids: set) -> Dict[str, List[str]]:
+    """party wiki_id -> sorted wiki_ids of its members, restricted to the given persons"""
+    query = """
+        SELECT DISTINCT ?person ?political_party
+        WHERE {
+            ?person wdt:P31 wd:Q5 ;
+                    wdt:P102 ?political_party .
+        }
+        """
+    results = query_sparql(PREFIXES + "\n" + query, "wikidata")
+    members: Dict[str, List[str]] = defaultdict(list)
+    for r in results["results"]["bindings"]:
+        person = r["person"]["value"].split("/")[-1]
+        if person not in person_wiki_ids:
+            continue
+        members[r["political_party"]["value"].split("/")[-1]].append(person)
+    return {party: sorted(wiki_ids) for party, wiki_ids in sorted(members.items())}
+
+
+def get_all_relationships() -> List[Dict[str, str]]:
+    """Every relationship in the politiquices graph together with the article it was
+    extracted from, in the same shape the API returns relationship rows"""
+    query = """
+        SELECT ?rel ?arquivo_doc ?date ?creator ?publisher ?title ?description ?rel_type ?ent1 ?ent1_str ?ent2 ?ent2_str
+        WHERE {
+            ?rel politiquices:url ?arquivo_doc ;
+                 politiquices:type ?rel_type ;
+                 politiquices:ent1 ?ent1 ;
+                 politiquices:ent2 ?ent2 ;
+                 politiquices:ent1_str ?ent1_str ;
+                 politiquices:ent2_str ?ent2_str .
+            ?arquivo_doc dc:title ?title ;
+                         dc:description ?description ;
+                         dc:creator ?creator ;
+                         dc:publisher ?publisher ;
+                         dc:date ?date .
+        }
+        ORDER BY ?date ?arquivo_doc
+        """
+    results = query_sparql(PREFIXES + "\n" + query, "politiquices")
+    return [
+        {
+            "arquivo_doc": r["arquivo_doc"]["value"],
+            "date": r["date"]["value"],
+            "title": r["title"]["value"],
+            "domain": r["creator"]["value"],
+            "original_url": r["publisher"]["value"],
+            "paragraph": r["description"]["value"],
+            "rel_type": r["rel_type"]["value"],
+            "ent1_id": r["ent1"]["value"].split("/")[-1],
+            "ent1_str": r["ent1_str"]["value"],
+            "ent2_id": r["ent2"]["value"].split("/")[-1],
+            "ent2_str": r["ent2_str"]["value"],
+        }
+        for r in results["results"]["bindings"]
+    ]
+
+
+# facet -> the triple patterns linking ?person to each ?value of that facet, as in the
+# queries behind the /personalities/{facet}/{wiki_id} routes
+FACET_PATTERNS = {
+    "education": "?person p:P69 ?stmt . ?stmt ps:P69 ?value .",
+    "occupation": "?person p:P106 ?stmt . ?stmt ps:P106 ?value .",
+    "public_office": "?person p:P39 ?stmt . ?stmt ps:P39 ?value .",
+    "government": "?person wdt:P27 wd:Q45 ; p:P39 ?stmt . ?stmt pq:P5054 ?value .",
+    "assembly": "?person wdt:P27 wd:Q45 ; p:P39 ?stmt . ?stmt pq:P2937 ?value .",
+    "party": "?person wdt:P102 ?value .",
+}
+
+
+def get_persons_facets(person_wiki_ids: set) -> Dict[str, Any]:
+    """For the given persons: 'facets', facet -> value wiki_id -> sorted person wiki_ids;
+    'labels', value wiki_id -> its Portuguese label, when it has one; 'names', person
+    wiki_id -> Portuguese label, persons without one are left out of 'facets' too"""
+    query = """
+        SELECT DISTINCT ?person ?name
+        WHERE {
+            ?person wdt:P31 wd:Q5 ;
+                    rdfs:label ?name . FILTER(LANG(?name) = "pt")
+        }
+        """
+    results = query_sparql(PREFIXES + "\n" + query, "wikidata")
+    names = {}
+    for r in results["results"]["bindings"]:
+        person = r["person"]["value"].split("/")[-1]
+        if person in person_wiki_ids and person not in names:
+            names[person] = r["name"]["value"]
+
+    facets: Dict[str, Dict[str, List[str]]] = {}
+    labels: Dict[str, str] = {}
+    for facet, pattern in FACET_PATTERNS.items():
+        query = f"""
+            SELECT DISTINCT ?person ?value ?value_label
+            WHERE {{
+                ?person wdt:P31 wd:Q5 .
+                {pattern}
+                OPTIONAL {{ ?value rdfs:label ?value_label . FILTER(LANG(?value_label) = "pt") }}
+            }}
+            """
+        results = query_sparql(PREFIXES + "\n" + query, "wikidata")
+        values: Dict[str, set] = defaultdict(set)
+        for r in results["results"]["bindings"]:
+            person = r["person"]["value"].split("/")[-1]
+            if person not in names:
+                continue
+            value = r["value"]["value"].split("/")[-1]
+            values[value].add(person)
+            if "value_label" in r:
+                labels.setdefault(value, r["value_label"]["value"])
+        facets[facet] = {value: sorted(persons) for value, persons in sorted(values.items())}
+    return {"facets": facets, "labels": labels, "names": names}
+
+
+# Person field -> the triple patterns linking ?person to each ?value of it, as in
+# sparql.get_person_detailed_info, where each of these is one query per person
+PROFILE_PATTERNS = {
+    "positions": "?person p:P39 ?stmt . ?stmt ps:P39 ?value .",
+    "education": "?person p:P69 ?stmt . ?stmt ps:P69 ?value .",
+    "occupations": "?person p:P106 ?stmt . ?stmt ps:P106 ?value .",
+    "governments": "?person p:P39 ?stmt . ?stmt pq:P5054 ?value .",
+    "assemblies": "?person p:P39 ?stmt . ?stmt pq:P2937 ?value .",
+}
+
+
+def get_persons_profiles(person_wiki_ids: set) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
+    """person wiki_id -> the lists of a Person (see data_models.py) that come from Wikidata:
+    'parties' as {wiki_id, name, image_url} and the others as {wiki_id, label}, with the
+    value's URI as wiki_id, like get_person_info/get_person_detailed_info return them"""
+    profiles: Dict[str, Dict[str, List[Dict[str, str]]]] = {
+        wiki_id: {"parties": [], **{field: [] for field in PROFILE_PATTERNS}} for wiki_id in person_wiki_ids
+    }
+
+    query = """
+        SELECT DISTINCT ?person ?political_party ?political_party_label
+        WHERE {
+            ?person wdt:P31 wd:Q5 ;
+                    p:P102 ?political_partyStmnt .
+            ?political_partyStmnt ps:P102 ?political_party .
+            ?political_party rdfs:label ?political_party_label . FILTER(LANG(?political_party_label) = "pt")
+        }
+        """
+    results = query_sparql(PREFIXES + "\n" + query, "wikidata")
+    for r in results["results"]["bindings"]:
+        person = r["person"]["value"].split("/")[-1]
+        if person not in profiles:
+            continue
+        party = r["political_party"]["value"].split("/")[-1]
+        entry = {"wiki_id": party, "name": r["political_party_label"]["value"], "image_url": party_logo_url(party)}
+        if entry not in profiles[person]["parties"]:
+            profiles[person]["parties"].append(entry)
+
+    for field, pattern in PROFILE_PATTERNS.items():
+        query = f"""
+            SELECT DISTINCT ?person ?value ?value_label
+            WHERE {{
+                ?person wdt:P31 wd:Q5 .
+                {pattern}
+                ?value rdfs:label ?value_label . FILTER(LANG(?value_label) = "pt")
+            }}
+            """
+        results = query_sparql(PREFIXES + "\n" + query, "wikidata")
+        for r in results["results"]["bindings"]:
+            person = r["person"]["value"].split("/")[-1]
+            if person not in profiles:
+                continue
+            if field == "occupations" and r["value_label"]["value"] == "político":
+                continue
+            entry = {"wiki_id": r["value"]["value"], "label": r["value_label"]["value"]}
+            if entry not in profiles[person][field]:
+                profiles[person][field].append(entry)
+    return profiles
@@ -0,0 +1,144 @@
+"""
+Autocomplete over entity names, persons and parties alike.
+
+Names are folded (lowercased, accents stripped, punctuation dropped) so that "antonio"
+finds "António". Entries are numbered by popularity, most articles first, which makes
+ranking a matter of keeping the lowest numbers. Two structures answer a query:
+
+- a sorted array with the folded name starting at each of its words, e.g. "antonio costa"
+  and "costa", where a prefix is a bisect plus a scan over the matching range;
+- trigram postings, each a list of entry numbers in popularity order, for matches in
+  the middle of a word, e.g. "osta": the candidates are the entries with its rarest
+  trigram, checked against their folded names.
+
+A query shorter than a trigram has no postings: it only matches at the start of a word.
+
+`entity_index`, over the persons and parties of the cache, is rebuilt every time the
+cache is (re)loaded.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from cache import all_entities_info, on_load, parties, party_members
+from config import NO_IMAGE, party_logo_url
+
+_NOT_ALNUM = re.compile(r"[^a-z0-9]+")
+_TRIGRAM = 3
+
+
+def fold(text: str) -> str:
+    """'Partido Socialista - PS' -> 'partido socialista ps', 'António' -> 'antonio'"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NOT_ALNUM.sub(" ", stripped).strip()
+
+
+def _trigrams(folded: str) -> Set[str]:
+    return {folded[idx : idx + _TRIGRAM] for idx in range(len(folded) - _TRIGRAM + 1)}
+
+
+class SuggestIndex:
+    """Built from entries with at least 'wiki_id', 'name' and 'nr_articles'; suggest()
+    returns those same entries."""
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = ()):
+        self.entries: List[Dict[str, Any]] = []
+        self.names: List[str] = []
+        self.prefixes: List[Tuple[str, int]] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.build(entries)
+
+    def build(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """replaces whatever was indexed before with `entries`"""
+        ranked = sorted(entries, key=lambda x: (-x.get("nr_articles", 0), x["name"]))
+        names = [fold(entry["name"]) for entry in ranked]
+        prefixes = []
+        postings: Dict[str, List[int]] = {}
+        for rank, name in enumerate(names):
+            for match in re.finditer(r"\S+", name):
+                prefixes.append((name[match.start() :], rank))
+            # ranks are visited in order, so every posting list comes out sorted
+            for trigram in _trigrams(name):
+                postings.setdefault(trigram, []).append(rank)
+        prefixes.sort()
+        # swapped in all at once, a request never sees half an index
+        self.entries, self.names, self.prefixes, self.postings = ranked, names, prefixes, postings
+
+    def _accepts(self, rank: int, entity_type: Optional[str]) -> bool:
+        return entity_type is None or self.entries[rank].get("type") == entity_type
+
+    def _prefix_matches(self, query: str, k: int, entity_type: Optional[str]) -> List[int]:
+        ranks = set()
+        idx = bisect_left(self.prefixes, (query, -1))
+        while idx < len(self.prefixes) and self.prefixes[idx][0].startswith(query):
+            if self._accepts(self.prefixes[idx][1], entity_type):
+                ranks.add(self.prefixes[idx][1])
+            idx += 1
+        return heapq.nsmallest(k, ranks)
+
+    def _infix_matches(self, query: str, k: int, entity_type: Optional[str], exclude: Set[int]) -> List[int]:
+        trigrams = _trigrams(query)
+        # only names with the query's rarest trigram can contain it; checking those names
+        # directly is cheaper than intersecting with the other postings
+        rarest = min((self.postings.get(trigram, []) for trigram in trigrams), key=len)
+        ranks = []
+        for rank in rarest:
+            if rank in exclude or not self._accepts(rank, entity_type):
+                continue
+            if query in self.names[rank]:
+                ranks.append(rank)
+                if len(ranks) == k:
+                    break
+        return ranks
+
+    def suggest(self, query: str, k: int = 10, entity_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Up to `k` entries: those with a word starting with `query` first, then those
+        containing it anywhere, each group by popularity; a `query` shorter than a trigram
+        only matches at the start of a word. With `entity_type` only the entries whose
+        'type' is that."""
+        folded = fold(query)
+        if not folded:
+            return []
+        ranks = self._prefix_matches(folded, k, entity_type)
+        if len(ranks) < k and len(folded) >= _TRIGRAM:
+            ranks += self._infix_matches(folded, k - len(ranks), entity_type, set(ranks))
+        return [self.entries[rank] for rank in ranks]
+
+
+# persons and parties
+entity_index = SuggestIndex()
+
+
+def _rebuild() -> None:
+    # a party's popularity is the articles of its members, its name the label with the
+    # acronym, e.g. 'PS - Partido Socialista'
+    entries = [
+        {
+            "wiki_id": wiki_id,
+            "name": info["name"],
+            "type": "person",
+            "image_url": info.get("image_url", NO_IMAGE),
+            "nr_articles": info.get("nr_articles", 0),
+        }
+        for wiki_id, info in all_entities_info.items()
+    ]
+    entries.extend(
+        {
+            "wiki_id": party["value"],
+            "name": party["label"],
+            "type": "party",
+            "image_url": party_logo_url(party["value"]),
+            "nr_articles": sum(
+                all_entities_info.get(member, {}).get("nr_articles", 0)
+                for member in party_members.get(party["value"], [])
+            ),
+        }
+        for party in parties
+    )
+    entity_index.build(entries)
+
+
+on_load(_rebuild)
@@ -0,0 +1,177 @@
+"""
+Full-text search over the articles' titles and paragraphs, with BM25 ranking.
+
+generate_caches.py writes the inverted index as a single binary segment, which the API
+maps into memory: only the term dictionary and the documents' keys are decoded when the
+segment is opened; document lengths and postings are read straight from the mapping.
+
+Segment layout, all integers unsigned 32 bits little-endian:
+
+    header      b"PQFT", version, nr_docs, nr_terms, avg_doc_length (float64)
+    doc_lengths nr_docs
+    doc_keys    nr_docs + 1 offsets into the UTF-8 blob that follows, padded to 4 bytes
+    terms       nr_terms + 1 offsets into the UTF-8 blob that follows, padded, terms sorted
+    postings    nr_terms + 1 offsets into the (doc, tf) pairs that follow, in pairs
+"""
+import math
+import mmap
+import re
+import struct
+import sys
+from array import array
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from suggest_index import fold
+
+_HEADER = struct.Struct("<4sIIId")
+_MAGIC = b"PQFT"
+_VERSION = 1
+
+# BM25 parameters, the usual defaults
+K1 = 1.2
+B = 0.75
+
+# already folded, see suggest_index.fold()
+STOPWORDS = frozenset(
+    """
+    a o as os um uma uns umas de do da dos das em no na nos nas num numa por pelo pela pelos
+    pelas para pra com sem sob sobre entre ate ao aos e ou mas nem que se como quando onde
+    porque ja nao sim mais menos muito muita muitos muitas ser foi foram sao era esta este
+    estes estas esse essa esses essas isso isto aquele aquela aqueles aquelas ele ela eles
+    elas seu sua seus suas lhe lhes me te vos ha tem ter tambem so apos diz disse
+    """.split()
+)
+
+
+def stem(token: str) -> str:
+    """Light Portuguese stemming, plurals and adverbs only: 'eleicoes' -> 'eleicao',
+    'partidos' -> 'partido', 'claramente' -> 'clara'; short tokens are left alone."""
+    if len(token) <= 3:
+        return token
+    if token.endswith("mente") and len(token) > 7:
+        token = token[:-5]
+    for suffix, replacement in (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ois", "ol")):
+        if token.endswith(suffix):
+            return token[: -len(suffix)] + replacement
+    if token.endswith("ns"):
+        return token[:-2] + "m"
+    if token.endswith(("res", "zes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(token) for token in re.findall(r"[a-z0-9]+", fold(text)) if token not in STOPWORDS]
+
+
+def _u32(values: Iterable[int]) -> bytes:
+    data = array("I", values)
+    if sys.byteorder == "big":  # pragma: no cover
+        data.byteswap()
+    return data.tobytes()
+
+
+def _strings(values: List[str]) -> bytes:
+    blobs = [value.encode("utf8") for value in values]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    data = b"".join(blobs)
+    return _u32(offsets) + data + b"\0" * (-len(data) % 4)
+
+
+def write_segment(docs: Iterable[Tuple[str, str]], path: str) -> int:
+    """Indexes `docs`, (key, text) pairs, into a segment at `path`; returns how many"""
+    keys: List[str] = []
+    lengths: List[int] = []
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for doc_id, (key, text) in enumerate(docs):
+        tokens = tokenize(text)
+        keys.append(key)
+        lengths.append(len(tokens))
+        for term, freq in Counter(tokens).items():
+            postings.setdefault(term, []).append((doc_id, freq))
+
+    terms = sorted(postings)
+    offsets = [0]
+    pairs: List[int] = []
+    for term in terms:
+        for doc_id, freq in postings[term]:
+            pairs.extend((doc_id, freq))
+        offsets.append(len(pairs) // 2)
+
+    avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+    with open(path, "wb") as f_out:
+        f_out.write(_HEADER.pack(_MAGIC, _VERSION, len(keys), len(terms), avg_length))
+        f_out.write(_u32(lengths))
+        f_out.write(_strings(keys))
+        f_out.write(_strings(terms))
+        f_out.write(_u32(offsets))
+        f_out.write(_u32(pairs))
+    return len(keys)
+
+
+class SearchSegment:
+    def __init__(self, path: str):
+        with open(path, "rb") as f_in:
+            self._mmap = mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.nr_docs, nr_terms, self.avg_length = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a search segment this version can read")
+        self._view = memoryview(self._mmap)
+        position = _HEADER.size
+        self.lengths, position = self._ints(position, self.nr_docs)
+        self.keys, position = self._read_strings(position, self.nr_docs)
+        terms, position = self._read_strings(position, nr_terms)
+        self.terms = {term: idx for idx, term in enumerate(terms)}
+        self._offsets, position = self._ints(position, nr_terms + 1)
+        self._pairs, _ = self._ints(position, 2 * self._offsets[-1] if nr_terms else 0)
+
+    def _ints(self, position: int, count: int):
+        end = position + 4 * count
+        if sys.byteorder == "little":
+            return self._view[position:end].cast("I"), end
+        values = array("I", self._view[position:end].tobytes())  # pragma: no cover
+        values.byteswap()  # pragma: no cover
+        return values, end  # pragma: no cover
+
+    def _read_strings(self, position: int, count: int) -> Tuple[List[str], int]:
+        offsets, position = self._ints(position, count + 1)
+        blob = bytes(self._view[position : position + offsets[-1]])
+        strings = [blob[offsets[idx] : offsets[idx + 1]].decode("utf8") for idx in range(count)]
+        return strings, position + offsets[-1] + (-offsets[-1] % 4)
+
+    def postings(self, term: str) -> Iterable[Tuple[int, int]]:
+        idx = self.terms.get(term)
+        if idx is None:
+            return []
+        start, end = self._offsets[idx], self._offsets[idx + 1]
+        pairs = self._pairs[2 * start : 2 * end]
+        return zip(pairs[::2], pairs[1::2])
+
+    def search(
+        self, query: str, k: int = 20, accept: Optional[Callable[[int], bool]] = None
+    ) -> List[Tuple[int, float]]:
+        """The `k` best (doc_id, score) for `query`, best first; with `accept`, only among
+        the documents it returns True for"""
+        scores: Counter = Counter()
+        for term in set(tokenize(query)):
+            idx = self.terms.get(term)
+            if idx is None:
+                continue
+            doc_freq = self._offsets[idx + 1] - self._offsets[idx]
+            idf = math.log(1 + (self.nr_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            for doc_id, freq in self.postings(term):
+                norm = K1 * (1 - B + B * self.lengths[doc_id] / (self.avg_length or 1.0))
+                scores[doc_id] += idf * freq * (K1 + 1) / (freq + norm)
+        ranked = ((doc_id, score) for doc_id, score in scores.most_common())
+        results = []
+        for doc_id, score in ranked:
+            if accept is None or accept(doc_id):
+                results.append((doc_id, score))
+                if len(results) == k:
+                    break
+        return results
@@ -1,8 +1,9 @@
 import re
 from random import randint
 from time import sleep
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
 
-from cache import all_parties_info, all_entities_info
+from cache import EntityType, entity_types
 
 
 def make_https(url):
@@ -21,17 +22,17 @@ def invert_relationship(rel_type):
     return rel_type_inverted
 
 
-def get_info(wiki_id):
+def get_info(wiki_id: str) -> EntityType:
     """Returns whether the entity is party or person"""
-    for entry in all_parties_info:
-        if entry["wiki_id"] == wiki_id:
-            return "party"
+    if wiki_id not in entity_types:
+        raise ValueError(f"invalid wiki_id {wiki_id}")
+    return entity_types[wiki_id]
 
-    for entry in all_entities_info.keys():
-        if entry == wiki_id:
-            return "person"
 
-    raise ValueError(f"invalid wiki_id {wiki_id}")
+def get_entity_types(wiki_ids: Iterable[str]) -> Dict[str, Optional[EntityType]]:
+    """Batch version of `get_info`: maps each wiki_id to "person", "party" or None when
+    it is neither, instead of raising on the first unknown one."""
+    return {wiki_id: entity_types.get(wiki_id) for wiki_id in wiki_ids}
 
 
 def _process_rel_type(rel_type):
@@ -48,6 +49,52 @@ def _process_rel_type(rel_type):
     return rel_type, rel_type_inverted
 
 
+def rel_type_matches(requested: Optional[str], rel_type: str) -> bool:
+    """Local counterpart of the REGEX filters `_process_rel_type` builds: whether `rel_type`,
+    already oriented from ent1's point of view, is one the requested filter selects."""
+    if requested in {"ent1_opposes_ent2", "ent1_supports_ent2", "ent2_opposes_ent1", "ent2_supports_ent1"}:
+        return rel_type == requested
+    if requested == "all_sentiment":
+        return "opposes" in rel_type or "supports" in rel_type
+    return True
+
+
+# the keys of a relationship row, as built by sparql.py and relationship_index.py
+RELATIONSHIP_FIELDS = (
+    "arquivo_doc",
+    "date",
+    "title",
+    "domain",
+    "original_url",
+    "paragraph",
+    "rel_type",
+    "ent1_id",
+    "ent1_str",
+    "ent1_img",
+    "ent2_id",
+    "ent2_str",
+    "ent2_img",
+)
+
+
+def parse_fields(fields: Optional[str], valid: Iterable[str]) -> Optional[FrozenSet[str]]:
+    """A `fields=a,b,c` query parameter as a frozenset, None when absent, i.e.: all of them.
+    Raises ValueError on a name not in `valid`."""
+    if fields is None:
+        return None
+    requested = frozenset(field.strip() for field in fields.split(",") if field.strip())
+    unknown = requested.difference(valid)
+    if unknown:
+        raise ValueError(f"unknown fields {sorted(unknown)}, valid ones are {list(valid)}")
+    return requested
+
+
+def project(rows: List[Dict[str, Any]], fields: Optional[FrozenSet[str]]) -> List[Dict[str, Any]]:
+    if fields is None:
+        return rows
+    return [{key: value for key, value in row.items() if key in fields} for row in rows]
+
+
 def get_chart_labels_min_max(min_date="1994", max_date="2022"):
     # ToDo: compute min_date and max_date on the fly
     all_years = []
@@ -0,0 +1,5 @@
+import os
+
+# the modules reading the caches load them as soon as they are imported, from this small
+# fixture instead of the generated json/
+os.environ.setdefault("STATIC_DATA", os.path.join(os.path.dirname(__file__), "fixtures", "json") + "/")
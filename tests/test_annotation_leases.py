@@ -0,0 +1,36 @@
+from src.annotation_leases import Leases
+
+
+def test_leases(tmp_path):
+    """
+     Test that a leased record is only available to its annotator until released or expired,
+     for every worker sharing the leases file
+    """
+    leases = Leases(tmp_path / "annotations.jsonl.leases", lease_seconds=10)
+    other_worker = Leases(tmp_path / "annotations.jsonl.leases", lease_seconds=10)
+    leases.lease("r1", "ana", now=0)
+
+    assert other_worker.available_to("r1", "ana", now=5)
+    assert not other_worker.available_to("r1", "rui", now=5)
+    assert other_worker.available_to("r1", "rui", now=10)
+    assert leases.holder("r1", now=10) is None
+
+    leases.lease("r2", "ana", now=0)
+    other_worker.release("r2")
+    assert leases.available_to("r2", "rui", now=1)
+
+
+def test_claim(tmp_path):
+    """
+     Test that claim() leases the first records not leased to another annotator, renewing
+     the annotator's own leases
+    """
+    leases = Leases(tmp_path / "annotations.jsonl.leases", lease_seconds=10)
+    assert leases.claim(["r1", "r2", "r3"], "ana", 2, now=0) == ["r1", "r2"]
+    assert leases.claim(["r1", "r2", "r3"], "rui", 2, now=5) == ["r3"]
+    assert leases.claim(["r1", "r2", "r3"], "ana", 3, now=5) == ["r1", "r2"]
+    assert leases.holder("r1", now=14) == "ana"
+    assert leases.claim(iter(["r1", "r2", "r3", "r4"]), "rui", 2, now=16) == ["r1", "r2"]
+
+    (tmp_path / "annotations.jsonl.leases").write_text('{"r1": ["ana"', encoding="utf-8")
+    assert leases.holder("r1", now=16) is None
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from src.annotation_log import AnnotationLog, GroupCommit
+
+
+def test_annotation_log_stats(tmp_path):
+    """
+     Test that the totals follow appends from any writer, a restart and a replaced file
+    """
+    path = tmp_path / "annotations.jsonl"
+    log = AnnotationLog(path)
+    log.load()
+    assert log.stats() == {"total_annotated": 0, "total_skipped": 0, "by_rel_type": {}}
+
+    assert log.commit(
+        [
+            {"record_id": "a", "action": "annotate", "rel_type": "ent1_opposes_ent2"},
+            {"record_id": "b", "action": "skip", "rel_type": "other"},
+            {"record_id": "a", "action": "skip", "rel_type": "other"},
+        ]
+    ) == [True, True, False]
+    # another worker's append, and one it's still writing
+    with open(path, "a", encoding="utf-8") as f_out:
+        f_out.write(json.dumps({"record_id": "c", "action": "annotate", "rel_type": "ent1_opposes_ent2"}) + "\n")
+        f_out.write('{"record_id": "d", ')
+    expected = {"total_annotated": 2, "total_skipped": 1, "by_rel_type": {"ent1_opposes_ent2": 2}}
+    assert log.stats() == expected
+    assert log.record_ids == {"a", "b", "c"}
+    assert log.commit([{"record_id": "c", "action": "skip"}]) == [False]
+
+    restarted = AnnotationLog(path)
+    restarted.load()
+    assert restarted.stats() == expected
+    assert restarted.record_ids == {"a", "b", "c"}
+
+    path.write_text(json.dumps({"record_id": "e", "action": "skip"}) + "\n", encoding="utf-8")
+    assert log.stats() == {"total_annotated": 0, "total_skipped": 1, "by_rel_type": {}}
+    assert log.record_ids == {"e"}
+
+
+def test_group_commit_cancelled(tmp_path):
+    """
+     Test that a submission cancelled while its batch is being written doesn't stop the
+     others in the batch from getting their result
+    """
+    log = AnnotationLog(tmp_path / "annotations.jsonl")
+    log.load()
+    writer = GroupCommit(log)
+
+    async def submit_both():
+        first = asyncio.ensure_future(writer.submit({"record_id": "a", "action": "skip"}))
+        second = asyncio.ensure_future(writer.submit({"record_id": "b", "action": "skip"}))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.wait_for(second, 5)
+
+    assert asyncio.run(submit_both()) is True
+    assert log.record_ids == {"a", "b"}
@@ -0,0 +1,50 @@
+import gzip
+
+import brotli
+from starlette.requests import Request
+
+from src.compression import compress, negotiate
+from src.responses import CachedJSON
+
+
+def test_negotiate():
+    """
+     Test the function negotiate from src/compression.py
+    """
+    assert negotiate("gzip, deflate, br", ("br", "gzip")) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert negotiate("br;q=0", ("br", "gzip")) is None
+    assert negotiate("*", ("gzip",)) == "gzip"
+    assert negotiate("identity", ("gzip",)) is None
+    assert negotiate("", ("gzip",)) is None
+
+
+def test_compress_gzip_roundtrip():
+    body = b'{"label":"Partido Socialista","value":"Q1"}' * 100
+    assert gzip.decompress(compress(body, "gzip")) == body
+
+
+def test_compress_brotli_roundtrip():
+    body = b'{"label":"Partido Socialista","value":"Q1"}' * 100
+    assert brotli.decompress(compress(body, "br")) == body
+    assert brotli.decompress(compress(body, "br", level=5)) == body
+
+
+def _request(accept_encoding):
+    return Request({"type": "http", "method": "GET", "headers": [(b"accept-encoding", accept_encoding.encode())]})
+
+
+def test_cached_json_encodings():
+    """
+     Test that CachedJSON serves the pre-compressed variant the client prefers, each with its
+     own ETag
+    """
+    cached = CachedJSON(lambda: [{"label": "Partido Socialista", "value": "Q1"}] * 100)
+    br = cached.response(_request("gzip, br"))
+    assert br.headers["content-encoding"] == "br"
+    assert brotli.decompress(br.body) == cached.body
+    gz = cached.response(_request("gzip"))
+    assert gz.headers["content-encoding"] == "gzip" and gzip.decompress(gz.body) == cached.body
+    plain = cached.response(_request("identity"))
+    assert "content-encoding" not in plain.headers and plain.body == cached.body
+    assert len({br.headers["etag"], gz.headers["etag"], plain.headers["etag"]}) == 3
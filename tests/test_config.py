@@ -0,0 +1,20 @@
+from src import config
+
+
+def test_party_logo_url(tmp_path, monkeypatch):
+    """
+     Test that party logos are looked up in the directory's map, SVG first, and that files
+     added later are picked up once the directory is checked again
+    """
+    for name in ["Q1.png", "Q1.svg", "Q2.JPG", "Q3.gif", "Q3.bmp"]:
+        (tmp_path / name).write_bytes(b"")
+    monkeypatch.setattr(config, "PARTY_LOGO_DIR", str(tmp_path))
+
+    assert config.party_logo_url("Q1") == f"/{tmp_path}/Q1.svg"
+    assert config.party_logo_url("Q2") == f"/{tmp_path}/Q2.JPG"
+    assert config.party_logo_url("Q3") == f"/{tmp_path}/Q3.gif"
+    assert config.party_logo_url("Q4") == config.NO_IMAGE
+
+    (tmp_path / "Q4.png").write_bytes(b"")
+    monkeypatch.setattr(config, "PARTY_LOGO_RECHECK_SECONDS", 0.0)
+    assert config.party_logo_url("Q4") == f"/{tmp_path}/Q4.png"
@@ -0,0 +1,70 @@
+from src.facet_index import get_personalities_by_facet, search_persons
+
+
+def _ids(results):
+    return [result["ent1"]["value"].split("/")[-1] for result in results]
+
+
+def test_personalities_by_facet():
+    """
+     Test that a facet value lists its persons by name, with their article counts, without
+     the persons that have no support/opposition articles or no name
+    """
+    education = get_personalities_by_facet("education", "Q900")
+    # Q9 has no name, so the Wikidata query would not have matched it
+    assert _ids(education) == ["Q1", "Q2"]
+    assert education[0] == {
+        "ent1": {"type": "uri", "value": "http://www.wikidata.org/entity/Q1"},
+        "ent1_name": {"type": "literal", "xml:lang": "pt", "value": "António Costa"},
+        "entity_label": {"type": "literal", "xml:lang": "pt", "value": "Universidade de Lisboa"},
+        "image_url": {"type": "uri", "value": "/assets/images/personalities_small/Q1.jpg"},
+        "nr_articles": 110,
+    }
+    assert education[1]["nr_articles"] == 75
+    # only education and occupation carry the value's label; Q901 has no Portuguese one
+    assert get_personalities_by_facet("occupation", "Q901") == []
+    assert "entity_label" not in get_personalities_by_facet("government", "Q902")[0]
+    assert _ids(get_personalities_by_facet("government", "Q902")) == ["Q3", "Q1"]
+    # Q4's 3 articles are all of type 'other'
+    assert _ids(get_personalities_by_facet("party", "Q100")) == ["Q1"]
+    assert get_personalities_by_facet("party", "Q404") == []
+
+
+def test_search_persons():
+    """
+     Test facets combined with any/all of their values, across facets, paging and counts
+    """
+    everyone = search_persons({})
+    assert everyone["total"] == 3
+    assert [item["wiki_id"] for item in everyone["items"]] == ["Q1", "Q2", "Q3"]
+    assert everyone["items"][1] == {
+        "wiki_id": "Q2",
+        "name": "Rui Rio",
+        "image_url": "/assets/images/logos/no_picture.jpg",
+        "nr_articles": 75,
+    }
+    counts = {facet: {c["wiki_id"]: c["count"] for c in values} for facet, values in everyone["counts"].items()}
+    assert counts["education"] == {"Q900": 2, "Q903": 1}
+    assert counts["government"] == {"Q902": 2}
+    assert counts["party"] == {"Q100": 1, "Q200": 1}
+    assert everyone["counts"]["education"][0] == {"wiki_id": "Q900", "label": "Universidade de Lisboa", "count": 2}
+    # party labels come from all_parties_info when facets.json has none
+    assert {c["label"] for c in everyone["counts"]["party"]} == {"Partido Socialista", "Partido Social Democrata"}
+
+    any_of = search_persons({"education": ["Q900", "Q903"]})
+    assert (any_of["total"], [item["wiki_id"] for item in any_of["items"]]) == (2, ["Q1", "Q2"])
+    # most persons are selected, their counts are the totals less the persons left out
+    any_counts = {facet: {c["wiki_id"]: c["count"] for c in values} for facet, values in any_of["counts"].items()}
+    assert (any_counts["education"], any_counts["government"]) == ({"Q900": 2, "Q903": 1}, {"Q902": 1})
+    assert any_counts["party"] == {"Q100": 1, "Q200": 1}
+    all_of = search_persons({"education": ["Q900", "Q903"]}, match_all=True)
+    assert (all_of["total"], [item["wiki_id"] for item in all_of["items"]]) == (1, ["Q1"])
+    assert {c["wiki_id"]: c["count"] for c in all_of["counts"]["government"]} == {"Q902": 1}
+
+    across = search_persons({"education": ["Q900"], "government": ["Q902"]})
+    assert [item["wiki_id"] for item in across["items"]] == ["Q1"]
+    assert search_persons({"education": ["Q404"]})["total"] == 0
+
+    page = search_persons({}, offset=1, limit=1)
+    assert (page["total"], [item["wiki_id"] for item in page["items"]]) == (3, ["Q2"])
+    assert search_persons({}, offset=5)["items"] == []
@@ -0,0 +1,53 @@
+import hashlib
+import json
+
+from src.jsonl_index import compute_entropy, open_index
+
+
+def _record_id(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def test_jsonl_index_pages(tmp_path):
+    """
+     Test that the index pages the listed records in file and entropy order, leaving out the
+     excluded ids, finds records by URL, and follows changes to the file
+    """
+    records = [
+        {"arquivo_url": "a", "predicted_scores": {"supports": 0.9, "opposes": 0.1}},
+        {"arquivo_url": "b", "predicted_scores": {"supports": 0.5, "opposes": 0.5}},
+        {"arquivo_url": "c", "predicted_scores": {"supports": 0.0}},
+        {"arquivo_url": "d", "predicted_scores": {"supports": 0.6, "opposes": 0.4}},
+        {"arquivo_url": "e"},
+    ]
+    path = tmp_path / "predictions.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in records[:3]) + "\n\n" + json.dumps(records[3]) + "\n")
+
+    index = open_index(str(path))
+    assert (tmp_path / "predictions.jsonl.idx").exists()
+    total, page = index.page("default", 0, 10)
+    assert total == 3 and [r["arquivo_url"] for r in page] == ["a", "b", "d"]
+    total, page = index.page("uncertainty", 1, 1)
+    assert total == 3 and [r["arquivo_url"] for r in page] == ["d"]
+    assert compute_entropy(records[1]["predicted_scores"]) == 1.0
+    assert [r["arquivo_url"] for r in index.page("margin", 0, 10)[1]] == ["b", "d", "a"]
+    assert [r["arquivo_url"] for r in index.page("least_confidence", 0, 10)[1]] == ["b", "d", "a"]
+
+    total, page = index.page("default", 0, 10, excluded={_record_id("a"), _record_id("c"), "not-hex"})
+    assert total == 2 and [r["arquivo_url"] for r in page] == ["b", "d"]
+    total, page = index.page("default", 1, 10, excluded={_record_id("a"), _record_id("c"), "not-hex"})
+    assert total == 2 and [r["arquivo_url"] for r in page] == ["d"]
+
+    # the head of the order only moves past excluded records, and starts over with fewer of them
+    listed = [idx for _, idx in index.listed("default", excluded={_record_id("a")})]
+    assert (listed, index._heads["default"]) == ([1, 3], 1)
+    listed = [idx for _, idx in index.listed("default", excluded={_record_id("a"), _record_id("b")})]
+    assert (listed, index._heads["default"]) == ([3], 2)
+    assert [record_id for record_id, _ in index.listed("default")] == [_record_id(url) for url in "abd"]
+
+    assert index.find("c") == records[2]
+    assert index.find("x") is None
+
+    with open(path, "a", encoding="utf8") as f_out:
+        f_out.write(json.dumps(records[4]) + "\n")
+    assert open_index(str(path)).find("e") == records[4]
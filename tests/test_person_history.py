@@ -0,0 +1,50 @@
+from src.person_history import PersonHistory, decode_cursor, encode_cursor
+
+
+def test_person_history_year_slices():
+    """
+     Test that PersonHistory answers single years and year ranges from its sorted rows
+    """
+    rows = [
+        {"arquivo_doc": "c", "date": "2012-03-01"},
+        {"arquivo_doc": "a", "date": "2010-01-01"},
+        {"arquivo_doc": "b", "date": "2010-12-31"},
+        {"arquivo_doc": "d", "date": "2014-06-01"},
+    ]
+    history = PersonHistory(rows)
+
+    assert [r["arquivo_doc"] for r in history.rows] == ["a", "b", "c", "d"]
+    assert [r["arquivo_doc"] for r in history.for_year(2010)] == ["a", "b"]
+    assert history.for_year(2011) == []
+    assert [r["arquivo_doc"] for r in history.for_years(2011, 2014)] == ["c", "d"]
+    assert history.for_years(1994, 2009) == []
+
+
+def test_person_history_pages():
+    """
+     Test that pages follow each other through their cursors, newest first, within a bucket
+    """
+    rows = [
+        {"arquivo_doc": doc, "date": date, "ent2_id": "Q2", "rel_type": rel_type}
+        for doc, date, rel_type in [
+            ("a", "2010-01-01", "opposes"),
+            ("b", "2010-01-01", "supported_by"),
+            ("c", "2011-05-01", "opposes"),
+            ("d", "2012-03-01", "supports"),
+            ("e", "2013-07-01", "opposes"),
+        ]
+    ]
+    history = PersonHistory(rows)
+
+    page, after = history.page("all", None, 2)
+    assert [r["arquivo_doc"] for r in page] == ["e", "d"]
+    page, after = history.page("all", decode_cursor(encode_cursor(after)), 2)
+    assert [r["arquivo_doc"] for r in page] == ["c", "b"]
+    page, after = history.page("all", after, 2)
+    assert [r["arquivo_doc"] for r in page] == ["a"] and after is None
+
+    page, after = history.page("opposes", None, 2)
+    assert [r["arquivo_doc"] for r in page] == ["e", "c"]
+    page, after = history.page("opposes", after, 2)
+    assert [r["arquivo_doc"] for r in page] == ["a"] and after is None
+    assert [r["arquivo_doc"] for r in history.page("sentiment", None, 10)[0]] == ["e", "d", "c", "a"]
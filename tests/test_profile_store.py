@@ -0,0 +1,64 @@
+import json
+from dataclasses import asdict
+
+from src import profile_store
+
+
+def _profile(wiki_id, name):
+    return {
+        "wiki_id": wiki_id,
+        "name": name,
+        "image_url": f"/assets/images/personalities_small/{wiki_id}.jpg",
+        "parties": [{"wiki_id": "Q100", "name": "Partido Socialista", "image_url": "/assets/images/parties/Q100.png"}],
+        "positions": [{"wiki_id": "Q700", "label": "primeiro-ministro"}],
+        "education": [{"wiki_id": "Q900", "label": "Universidade de Lisboa"}],
+        "occupations": [],
+        "governments": [],
+        "assemblies": [],
+    }
+
+
+def _write_store(directory, profiles):
+    # as generate_caches.profiles_cache() writes them
+    index = {}
+    with open(directory / profile_store.PROFILES_FILE, "wb") as f_out:
+        for profile in profiles:
+            data = json.dumps(profile).encode("utf8") + b"\n"
+            index[profile["wiki_id"]] = [f_out.tell(), len(data)]
+            f_out.write(data)
+    (directory / profile_store.INDEX_FILE).write_text(json.dumps(index), encoding="utf8")
+
+
+def test_get_profile(tmp_path, monkeypatch):
+    """
+     Test that a profile is read from its offset and length, and that reopening the store
+     picks up new files
+    """
+    monkeypatch.setattr(profile_store, "STATIC_DATA", f"{tmp_path}/")
+    _write_store(tmp_path, [_profile("Q1", "António Costa"), _profile("Q2", "Rui Rio")])
+    profile_store._reopen()
+
+    person = profile_store.get_profile("Q2")
+    assert (person.wiki_id, person.name) == ("Q2", "Rui Rio")
+    assert asdict(person) == {**_profile("Q2", "Rui Rio"), "relationships_charts": None}
+    assert profile_store.get_profile("Q1").name == "António Costa"
+    assert profile_store.get_profile("Q3") is None
+
+    _write_store(tmp_path, [_profile("Q3", "Assunção Cristas")])
+    profile_store._reopen()
+    assert profile_store.get_profile("Q3").name == "Assunção Cristas"
+    assert profile_store.get_profile("Q1") is None
+
+
+def test_get_profile_without_store(tmp_path, monkeypatch):
+    """
+     Test that without both files every profile is None, to be queried from Wikidata
+    """
+    monkeypatch.setattr(profile_store, "STATIC_DATA", f"{tmp_path}/")
+    profile_store._reopen()
+    assert profile_store.get_profile("Q1") is None
+
+    _write_store(tmp_path, [_profile("Q1", "António Costa")])
+    (tmp_path / profile_store.INDEX_FILE).unlink()
+    profile_store._reopen()
+    assert profile_store.get_profile("Q1") is None
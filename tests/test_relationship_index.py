@@ -0,0 +1,120 @@
+import json
+import os
+import re
+from collections import Counter
+
+from src.relationship_index import (
+    get_relationship_between_groups,
+    get_relationships_aggregate_by_party,
+    get_top_relationships,
+)
+
+with open(os.environ["STATIC_DATA"] + "relationships.json", encoding="utf8") as f_in:
+    ROWS = json.load(f_in)
+with open(os.environ["STATIC_DATA"] + "party_members.json", encoding="utf8") as f_in:
+    MEMBERS = json.load(f_in)
+
+INVERTED = {
+    "ent1_opposes_ent2": "ent2_opposes_ent1",
+    "ent2_opposes_ent1": "ent1_opposes_ent2",
+    "ent1_supports_ent2": "ent2_supports_ent1",
+    "ent2_supports_ent1": "ent1_supports_ent2",
+}
+
+
+def _previous_between_groups(group_a, group_b, relation, start_year, end_year):
+    # the UNION the SPARQL queries used to run: A as the triple's ent1 matching the REGEX of
+    # `relation`, or A as its ent2 matching the REGEX of its inverse; (arquivo_doc, A, B)
+    if relation in ("ent1_opposes_ent2", "ent1_supports_ent2"):
+        regex, regex_inverted = relation, INVERTED[relation]
+    elif relation == "all_sentiment":
+        regex = regex_inverted = ".*(opposes|supports).*"
+    else:
+        regex = regex_inverted = ".*"
+    found = set()
+    for row in ROWS:
+        if not start_year <= row["date"][:4] <= end_year:
+            continue
+        if row["ent1_id"] in group_a and row["ent2_id"] in group_b and re.search(regex, row["rel_type"]):
+            found.add((row["arquivo_doc"], row["ent1_id"], row["ent2_id"]))
+        if row["ent1_id"] in group_b and row["ent2_id"] in group_a and re.search(regex_inverted, row["rel_type"]):
+            found.add((row["arquivo_doc"], row["ent2_id"], row["ent1_id"]))
+    return found
+
+
+def test_relationship_between_groups_matches_previous_queries():
+    """
+     Test that the rows between two parties are the ones the SPARQL UNION matched, oriented
+     from the first party's side, newest first
+    """
+    party_a, party_b = MEMBERS["Q100"], MEMBERS["Q200"]
+    for relation in ("all", "all_sentiment", "ent1_opposes_ent2", "ent1_supports_ent2"):
+        for start_year, end_year in (("1994", "2022"), ("2011", "2013")):
+            rows = get_relationship_between_groups(party_a, party_b, relation, start_year, end_year)
+            assert {(r["arquivo_doc"], r["ent1_id"], r["ent2_id"]) for r in rows} == _previous_between_groups(
+                party_a, party_b, relation, start_year, end_year
+            )
+            assert [r["date"] for r in rows] == sorted((r["date"] for r in rows), reverse=True)
+
+    rows = get_relationship_between_groups(party_a, party_b, "all", "1994", "2022")
+    by_doc = {(r["arquivo_doc"], r["ent1_id"]): r for r in rows}
+    # stored with Q2 as ent1: seen from the Q100 side, ent1 and ent2 and the rel_type are swapped
+    assert by_doc[("d3", "Q1")]["rel_type"] == "ent2_supports_ent1"
+    assert (by_doc[("d3", "Q1")]["ent1_str"], by_doc[("d3", "Q1")]["ent2_str"]) == ("Q1s", "Q2s")
+    assert by_doc[("d7", "Q4")]["rel_type"] == "ent1_supports_ent2"
+    # ent2_* filters select the B side acting on the A side
+    rows = get_relationship_between_groups(party_a, party_b, "ent2_opposes_ent1", "1994", "2022")
+    assert [(r["arquivo_doc"], r["rel_type"]) for r in rows] == [("d2", "ent2_opposes_ent1")]
+
+
+def _previous_top_relationships(wiki_id):
+    # the two SPARQL queries, person as subject and person as target, and their tallies
+    tallies = {key: Counter() for key in ("who_person_opposes", "who_person_supports")}
+    tallies.update({key: Counter() for key in ("who_opposes_person", "who_supports_person")})
+    for row in ROWS:
+        rel_type = row["rel_type"]
+        for me, other, subject, target in (
+            ("ent1_id", "ent2_id", "ent1_", "ent2_"),
+            ("ent2_id", "ent1_id", "ent2_", "ent1_"),
+        ):
+            if row[me] != wiki_id:
+                continue
+            sign = "opposes" if "opposes" in rel_type else "supports" if "supports" in rel_type else None
+            if sign and rel_type.startswith(subject):
+                tallies[f"who_person_{sign}"][row[other]] += 1
+            if sign and rel_type.startswith(target):
+                tallies[f"who_{sign}_person"][row[other]] += 1
+    return {key: dict(counts) for key, counts in tallies.items()}
+
+
+def test_top_relationships_and_party_aggregates():
+    """
+     Test the top related personalities against the previous queries' tallies, and the
+     per-party rollup of who a person opposes and supports
+    """
+    for wiki_id in ("Q1", "Q2", "Q3", "Q4"):
+        top = get_top_relationships(wiki_id)
+        previous = _previous_top_relationships(wiki_id)
+        for key, entries in top.items():
+            assert {entry["wiki_id"]: entry["freq"] for entry in entries} == previous[key]
+            assert [entry["freq"] for entry in entries] == sorted((entry["freq"] for entry in entries), reverse=True)
+            total = sum(previous[key].values())
+            for entry in entries:
+                assert entry["relative"] == str(round(entry["freq"] / total * 100, 2)) + "%"
+
+    # Q4 (Q100) opposed Q2 (Q200) in 2013 and supported them in 2014
+    assert get_relationships_aggregate_by_party("Q4") == [
+        {
+            "wiki_id": "Q200",
+            "name": "Partido Social Democrata",
+            "image_url": "/y.svg",
+            "opposes": 1,
+            "supports": 1,
+            "years": [{"year": 2013, "opposes": 1, "supports": 0}, {"year": 2014, "opposes": 0, "supports": 1}],
+        }
+    ]
+    # Q2 opposed Q1 in 2011 and supported them in 2012; Q1 is a member of Q100
+    assert [(p["wiki_id"], p["opposes"], p["supports"]) for p in get_relationships_aggregate_by_party("Q2")] == [
+        ("Q100", 1, 1)
+    ]
+    assert get_relationships_aggregate_by_party("Q404") == []
@@ -0,0 +1,44 @@
+import cache  # the module sparql.py registers its hooks with, not src.cache
+from src import sparql
+
+
+def test_keyset_literal():
+    """
+     Test that the keys of a keyset page are escaped as SPARQL string literals
+    """
+    assert sparql._keyset_literal("https://arquivo.pt/wayback/1/x") == '"https://arquivo.pt/wayback/1/x"'
+    assert sparql._keyset_literal('a"b\\c\nd\re\tf') == '"a\\"b\\\\c\\nd\\re\\tf"'
+
+
+def test_get_all_relationships_paginated_after(monkeypatch):
+    """
+     Test that a page after a key filters on the escaped key, not the raw one
+    """
+    queries = []
+
+    def query_sparql(query, endpoint):
+        queries.append(query)
+        return {"results": {"bindings": []}}
+
+    monkeypatch.setattr(sparql, "query_sparql", query_sparql)
+    sparql.get_all_relationships_paginated(0, 10, after=('x" } DROP ALL #', "r"))
+    assert 'STR(?arquivo_doc) > "x\\" } DROP ALL #"' in queries[0]
+
+
+def test_person_history_reloaded(monkeypatch):
+    """
+     Test that a person's history is queried once, and again after the cache is reloaded
+    """
+    queries = []
+
+    def query_sparql(query, endpoint):
+        queries.append(query)
+        return {"results": {"bindings": []}}
+
+    monkeypatch.setattr(sparql, "query_sparql", query_sparql)
+    sparql.get_person_history.cache_clear()
+    assert sparql.get_person_history("Q1").rows == sparql.get_person_history("Q1").rows
+    assert len(queries) == 1
+    cache.load()
+    sparql.get_person_history("Q1")
+    assert len(queries) == 2
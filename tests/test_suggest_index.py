@@ -0,0 +1,36 @@
+from src.suggest_index import SuggestIndex, fold
+
+
+def test_fold():
+    """
+     Test that fold() ignores case, accents and punctuation
+    """
+    assert fold("António Costa") == "antonio costa"
+    assert fold("PS - Partido Socialista") == "ps partido socialista"
+    assert fold("  Zé  ") == "ze"
+
+
+def test_suggest():
+    """
+     Test that prefix matches come before infix ones, each group by popularity
+    """
+    index = SuggestIndex(
+        [
+            {"wiki_id": "Q1", "name": "António Costa", "type": "person", "nr_articles": 120},
+            {"wiki_id": "Q2", "name": "Rui Rio", "type": "person", "nr_articles": 80},
+            {"wiki_id": "Q3", "name": "Assunção Cristas", "type": "person", "nr_articles": 60},
+            {"wiki_id": "Q4", "name": "Costa Neves", "type": "person", "nr_articles": 10},
+            {"wiki_id": "Q100", "name": "PS - Partido Socialista", "type": "party", "nr_articles": 200},
+        ]
+    )
+
+    assert [e["wiki_id"] for e in index.suggest("antonio")] == ["Q1"]
+    assert [e["wiki_id"] for e in index.suggest("costa")] == ["Q1", "Q4"]
+    assert [e["wiki_id"] for e in index.suggest("cost", k=1)] == ["Q1"]
+    assert [e["wiki_id"] for e in index.suggest("ist")] == ["Q100", "Q3"]
+    assert [e["wiki_id"] for e in index.suggest("ps", entity_type="party")] == ["Q100"]
+    assert index.suggest("ps", entity_type="person") == []
+    # too short for a trigram: only the start of a word, not "Assunção Cristas"
+    assert [e["wiki_id"] for e in index.suggest("ri")] == ["Q2"]
+    assert index.suggest("xyz") == []
+    assert index.suggest("  ") == []
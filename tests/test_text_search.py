@@ -0,0 +1,30 @@
+from src.text_search import SearchSegment, tokenize, write_segment
+
+
+def test_tokenize():
+    """
+     Test that tokenize() folds accents, drops stopwords and reduces plurals
+    """
+    assert tokenize("As eleições dos Partidos") == ["eleicao", "partido"]
+    assert tokenize("Orçamentos e reformas, claramente") == ["orcamento", "reforma", "clara"]
+
+
+def test_search_segment(tmp_path):
+    """
+     Test that a written segment is read back and ranks documents with BM25
+    """
+    path = str(tmp_path / "search_index.bin")
+    docs = [
+        ("d1", "Costa critica orçamento\nO orçamento do Estado foi criticado"),
+        ("d2", "Rio elogia Costa\nRui Rio elogia o governo"),
+        ("d3", "Eleições autárquicas\nOs partidos preparam as eleições"),
+    ]
+    assert write_segment(docs, path) == 3
+
+    segment = SearchSegment(path)
+    assert segment.keys == ["d1", "d2", "d3"]
+    assert [doc_id for doc_id, _ in segment.search("orcamentos")] == [0]
+    assert sorted(doc_id for doc_id, _ in segment.search("costa")) == [0, 1]
+    assert [doc_id for doc_id, _ in segment.search("eleição")] == [2]
+    assert [doc_id for doc_id, _ in segment.search("costa", accept=lambda doc_id: doc_id == 1)] == [1]
+    assert segment.search("inexistente") == []